@@ -0,0 +1,105 @@
+"""Outbox throughput and crash-recovery benchmark.
+
+Drains N queued messages through outbox_drainer with a stub bot (no
+network), then times recover_outbox on N rows left in the 'sending'
+state, as after a crash. Uses a throwaway database.
+
+    python bench_outbox.py -n 5000 --latency 0.05 | tee bench_output.txt
+"""
+
+import argparse
+import asyncio
+import os
+import sqlite3
+import tempfile
+import time
+
+import main
+
+
+class StubBot:
+    def __init__(self, latency):
+        self.latency = latency
+        self.sent = 0
+
+    async def send_message(self, chat_id, text):
+        await asyncio.sleep(self.latency)
+        self.sent += 1
+
+    async def copy_message(self, chat_id, from_chat_id, message_id):
+        await self.send_message(chat_id, None)
+
+
+def seed_users(n):
+    with main.get_db() as conn:
+        conn.executemany(
+            "INSERT INTO users (bot, chat_id) VALUES (?, ?)",
+            ((main.DEFAULT_BOT_NAME, chat_id) for chat_id in range(1, n + 1)),
+        )
+
+
+def count_status(status):
+    with main.get_db() as conn:
+        return conn.execute("SELECT COUNT(*) FROM outbox WHERE status = ?", (status,)).fetchone()[0]
+
+
+async def bench_drain(n, latency):
+    bot = StubBot(latency)
+
+    started = time.perf_counter()
+    with main.get_db() as conn:
+        queued = main.enqueue_outbox(conn, "all", "text", "bench", main.PRIO_BROADCAST)
+    enqueued = time.perf_counter() - started
+
+    await main.start_outbound({main.DEFAULT_BOT_NAME: bot})
+    started = time.perf_counter()
+    while count_status(main.OUTBOX_DONE) < queued:
+        await asyncio.sleep(0.05)
+    drained = time.perf_counter() - started
+    await main.stop_outbound()
+
+    print(f"enqueue {queued} rows: {enqueued * 1000:.1f} ms")
+    print(f"drain {bot.sent} sends: {drained:.2f} s ({bot.sent / drained:.0f} msg/s)")
+
+
+def bench_recover(n):
+    with main.get_db() as conn:
+        conn.execute("DELETE FROM outbox")
+        conn.executemany(
+            """INSERT INTO outbox (bot, chat_id, kind, payload, priority, status, created_at)
+               VALUES (?, ?, 'text', 'bench', ?, ?, ?)""",
+            ((main.DEFAULT_BOT_NAME, chat_id, main.PRIO_BROADCAST, main.OUTBOX_SENDING, time.time())
+             for chat_id in range(1, n + 1)),
+        )
+
+    started = time.perf_counter()
+    recovered = main.recover_outbox()
+    elapsed = time.perf_counter() - started
+    print(f"recover {recovered} in-flight rows: {elapsed * 1000:.1f} ms")
+
+
+def main_bench():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("-n", type=int, default=2000, help="number of recipients")
+    parser.add_argument("--latency", type=float, default=0.0, help="stub send latency in seconds")
+    parser.add_argument("--rate", type=float, default=None, help="override OUTBOUND_RATE (default: unlimited)")
+    args = parser.parse_args()
+
+    # the stub bot has no Telegram limits, so the global rate is lifted unless asked for
+    main.OUTBOUND_RATE = args.rate or 1e9
+    main.OUTBOX_POLL = 0.1
+
+    with tempfile.TemporaryDirectory() as tmp:
+        main.DB_NAME = os.path.join(tmp, "bench.db")
+        main.init_db()
+        seed_users(args.n)
+
+        print(f"sqlite {sqlite3.sqlite_version}, n={args.n}, latency={args.latency}s, "
+              f"rate={args.rate or 'unlimited'}, concurrency={main.OUTBOUND_CONCURRENCY}, "
+              f"batch={main.OUTBOX_BATCH}x{main.OUTBOX_INFLIGHT}")
+        asyncio.run(bench_drain(args.n, args.latency))
+        bench_recover(args.n)
+
+
+if __name__ == "__main__":
+    main_bench()
@@ -850,8 +850,39 @@ import sqlite3
 import datetime
 import pytz
 import os
-
-from telegram import Update, ReplyKeyboardMarkup, KeyboardButton
+import csv
+import io
+import json
+import gzip
+import glob
+import asyncio
+import tempfile
+import time
+import queue
+import atexit
+import sys
+import threading
+import bisect
+import string
+import heapq
+import itertools
+import signal
+import hashlib
+import math
+from collections import OrderedDict, Counter
+from logging.handlers import QueueHandler, QueueListener
+
+from telegram import (
+    Update,
+    ReplyKeyboardMarkup,
+    KeyboardButton,
+    InlineQueryResultArticle,
+    InlineQueryResultCachedDocument,
+    InlineQueryResultCachedPhoto,
+    InputTextMessageContent,
+    InlineKeyboardButton,
+    InlineKeyboardMarkup,
+)
 from telegram.ext import (
     ApplicationBuilder,
     ContextTypes,
@@ -859,29 +890,41 @@ from telegram.ext import (
     MessageHandler,
     ConversationHandler,
     filters,
+    TypeHandler,
+    ApplicationHandlerStop,
+    InlineQueryHandler,
+    CallbackQueryHandler,
 )
+from telegram.error import RetryAfter, BadRequest
+from telegram.request import HTTPXRequest
 
 # ---------------------------------------------------------------------------
 # 1. CONFIGURATION
 # ---------------------------------------------------------------------------
-BOT_TOKEN="8536104698:AAGaLuPkiTv3kxkLpi6lt3Xxv6GNNr-uvdo"
-
-# BOT_TOKEN = os.getenv("BOT_TOKEN")
-if not BOT_TOKEN:
-    raise ValueError("❌ BOT_TOKEN environment variable is missing!")
+# config.json (or BOT_CONFIG) and env vars override these, see load_config()
+CONFIG_FILE = os.getenv("BOT_CONFIG", "config.json")
 
+BOT_TOKEN = None
 ADMIN_USERNAMES = ['mrx_46x', 'cr_username']
 DB_NAME = "simple_uni.db"
 
-BD_TZ = pytz.timezone('Asia/Dhaka')
+# several bots can share this process: set "bots" in the config file to a list of
+# {"name": ..., "token": ..., "admin_usernames": [...]}; otherwise bot_token is used.
+# Notices, classes and teachers are shared by all bots and notices and reminders
+# reach every bot's users. Only the first bot's admins may replace the class
+# routine. Broadcasts stay with the sending bot, since they copy its message.
+DEFAULT_BOT_NAME = "main"
+BOTS = []
+HTTP_POOL_SIZE = 32
 
-TEACHER_LIST_TEXT = """
-👨‍🏫 *University Teacher List*
+BD_TZ = pytz.timezone('Asia/Dhaka')
 
-1️⃣ *Asad Sir* — Mathematics  
-2️⃣ *Moni Khan* — CSE  
-3️⃣ *Rahim Uddin* — Physics  
-"""
+TEACHER_SEED = [
+    ("Asad Sir", "Mathematics"),
+    ("Moni Khan", "CSE"),
+    ("Rahim Uddin", "Physics"),
+]
+TEACHER_SEARCH_LIMIT = 10
 
 (
     ADD_CLASS_TIME,
@@ -892,11 +935,302 @@ TEACHER_LIST_TEXT = """
     ADD_NOTICE_BODY,
     BROADCAST_MSG,
     ADD_RESOURCE_FILE,
-) = range(8)
+    IMPORT_SCHEDULE_FILE,
+) = range(9)
+
+PRIO_REPLY, PRIO_REMINDER, PRIO_BROADCAST, PRIO_DIGEST = range(4)
+PRIORITY_NAMES = ("reply", "reminder", "broadcast", "digest")
+OUTBOUND_RATE = 25.0
+OUTBOUND_CHAT_INTERVAL = 1.0
+OUTBOUND_CONCURRENCY = 8
+
+REMINDER_MINUTES = 5
+
+OUTBOX_PENDING, OUTBOX_SENDING, OUTBOX_DONE, OUTBOX_FAILED = range(4)
+OUTBOX_STATUS_NAMES = ("pending", "sending", "done", "failed")
+OUTBOX_BATCH = 50
+OUTBOX_INFLIGHT = 2
+OUTBOX_POLL = 5
+OUTBOX_RETENTION = 24 * 60 * 60
+OUTBOX_AUDIENCES = {"all": "1", "subscribers": "digest = 1"}
+
+STATS_FLUSH = 30
+STATS_TOP = 8
+MENU_BUTTONS = {
+    "📅 Full Routine", "🗓 Today Classes", "📢 Notices", "👨‍🏫 Teachers", "📂 View Resources",
+    "⚙ Add Today Class", "⚙ Add Notice", "⚙ Add Resources", "⚙ Broadcast", "⚙ Import Classes",
+}
+# only registered names become rollup keys, anything else a user types is "other"
+STATS_COMMANDS = {
+    "/start", "/cancel", "/done", "/import", "/export", "/res", "/throttle", "/profile",
+    "/digest", "/queue", "/stats", "/memory", "/teacher", "/teacher_add", "/teacher_del",
+}
+STATS_HOURLY_RETENTION = 7  # days
+ACTIVE_USERS_RETENTION = 2  # days, only today's rows are needed to count first sightings
+
+DIGEST_TIMES = ["08:00", "20:00"]
+DIGEST_BODY_CHARS = 300
+MAX_MESSAGE_CHARS = 4000
+URGENT_PREFIX = "!"
+
+INLINE_PAGE = 20
+INLINE_CACHE_TIME = 60
+
+MAX_IMPORT_BYTES = 1024 * 1024
+MAX_REJECTED_SHOWN = 10
+
+# daily_classes.day holds one of these; NULL means the class runs every day
+WEEKDAYS = ("mon", "tue", "wed", "thu", "fri", "sat", "sun")
+WEEKDAY_NAMES_BN = ("সোমবার", "মঙ্গলবার", "বুধবার", "বৃহস্পতিবার", "শুক্রবার", "শনিবার", "রবিবার")
+DAY_ALIASES = {
+    **{day: day for day in WEEKDAYS},
+    **{name: day for day, name in zip(WEEKDAYS, (
+        "monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday"))},
+    **{name: day for day, name in zip(WEEKDAYS, WEEKDAY_NAMES_BN)},
+}
+# order of days in the full routine
+ROUTINE_WEEK = ("sun", "mon", "tue", "wed", "thu", "fri", "sat")
+
+BACKUP_DIR = "backups"
+BACKUP_KEEP = 7
+BACKUP_INTERVAL = 6 * 60 * 60
+BACKUP_PAGES = 64
+BACKUP_SLEEP = 0.05
+
+EXPORT_TABLES = {
+    "users": "SELECT bot, chat_id, username, first_name, digest FROM users",
+    "notices": "SELECT id, title, body, created_at FROM notices",
+    "resources": "SELECT id, file_id, file_unique_id, file_type, course, category, caption, created_at FROM resources",
+}
+EXPORT_BATCH = 500
+
+# timetable images need Pillow >= 10.1 (sized default font); without it the
+# schedule is sent as text
+TIMETABLE_FONT = "DejaVuSans.ttf"
+TIMETABLE_FONT_SIZE = 22
+TIMETABLE_PADDING = 14
+TIMETABLE_VERSION = 1  # bump when the image layout changes
+TIMETABLE_HEADER = ("Time", "Course", "Room", "Teacher")
+
+RESOURCE_CATEGORIES = ("lecture", "lab", "slide", "book", "question", "other")
+RESOURCES_PAGE = 10
+
+NAV_PAGE = 5
+NAV_LABEL_CHARS = 30
+NAV_VIEWS_MAX = 10000
+CALLBACK_DATA_MAX = 64
+
+FLOW_KEY = "flow"
+FLOW_DATA_KEYS = (FLOW_KEY, "notice_title")
+FLOW_TIMEOUT = 10 * 60
+
+USER_DATA_TTL = 6 * 60 * 60
+USER_DATA_MAX = 5000
+USER_DATA_SWEEP = 10 * 60
+
+RATE_LIMIT_RATE = 1.0
+RATE_LIMIT_BURST = 5
+RATE_LIMIT_POLICY = "warn"  # drop | delay | warn
+RATE_LIMIT_POLICIES = ("drop", "delay", "warn")
+RATE_LIMIT_MAX_DELAY = 2.0
+RATE_LIMIT_IDLE = 10 * 60
+
+SEND_FAILURE_FLUSH = 60
+
+# settings that a config reload may change while the bot is running
+RELOADABLE_SETTINGS = (
+    "RATE_LIMIT_RATE",
+    "RATE_LIMIT_BURST",
+    "RATE_LIMIT_POLICY",
+    "OUTBOUND_RATE",
+    "OUTBOUND_CHAT_INTERVAL",
+    "REMINDER_MINUTES",
+    "BACKUP_KEEP",
+)
+# reloadable numbers that must be above zero; the rest only need to be >= 0
+POSITIVE_SETTINGS = ("RATE_LIMIT_RATE", "RATE_LIMIT_BURST", "OUTBOUND_RATE", "BACKUP_KEEP")
+
+PROFILE_INTERVAL = 0.005
+PROFILE_DEFAULT_SECONDS = 30
+PROFILE_MAX_SECONDS = 300
+PROFILE_GROUP = 100
+PROFILE_TOP = 10
+
+# ---------------------------------------------------------------------------
+# LOGGING
+# ---------------------------------------------------------------------------
 
-logging.basicConfig(level=logging.INFO)
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            "ts": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        return json.dumps(entry, ensure_ascii=False)
+
+def setup_logging():
+    handler = logging.StreamHandler()
+    handler.setFormatter(JsonFormatter())
+
+    # handlers only put records on the queue, the listener thread does the I/O
+    log_queue = queue.SimpleQueue()
+    listener = QueueListener(log_queue, handler, respect_handler_level=True)
+
+    root = logging.getLogger()
+    root.setLevel(logging.INFO)
+    root.handlers[:] = [QueueHandler(log_queue)]
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    listener.start()
+    atexit.register(listener.stop)
+
+setup_logging()
 logger = logging.getLogger(__name__)
 
+send_failures = {}
+
+def log_send_failure(chat_id, error):
+    key = f"{type(error).__name__}: {error}"
+    count = send_failures.get(key, 0)
+    if not count:
+        logger.warning("Failed to send to %s: %s", chat_id, error)
+    send_failures[key] = count + 1
+
+def flush_send_failures():
+    for key, count in send_failures.items():
+        if count > 1:
+            logger.warning("Failed to send %d more time(s): %s", count - 1, key)
+    send_failures.clear()
+
+async def send_failure_job(context: ContextTypes.DEFAULT_TYPE):
+    flush_send_failures()
+
+# ---------------------------------------------------------------------------
+# CONFIG LOADING
+# ---------------------------------------------------------------------------
+
+admin_set = {u.lower() for u in ADMIN_USERNAMES}
+
+# bot name -> running Application
+applications = {}
+
+def bot_admin_set(conf):
+    return {u.lstrip("@").lower() for u in conf.get("admin_usernames", ADMIN_USERNAMES)}
+
+def read_bots(config):
+    if not config.get("bots"):
+        return [{"name": DEFAULT_BOT_NAME, "token": config.get("bot_token", BOT_TOKEN)}]
+    return [
+        {"name": conf.get("name") or f"bot{index}", **conf}
+        for index, conf in enumerate(config["bots"], start=1)
+    ]
+
+def read_config():
+    config = {}
+    if os.path.exists(CONFIG_FILE):
+        with open(CONFIG_FILE, encoding="utf-8") as f:
+            config = json.load(f)
+
+    if os.getenv("BOT_TOKEN"):
+        config["bot_token"] = os.getenv("BOT_TOKEN")
+    if os.getenv("ADMIN_USERNAMES"):
+        config["admin_usernames"] = [u.strip() for u in os.getenv("ADMIN_USERNAMES").split(",") if u.strip()]
+    if os.getenv("DB_NAME"):
+        config["db_name"] = os.getenv("DB_NAME")
+    return config
+
+def check_usernames(key, value):
+    if not isinstance(value, list) or not all(isinstance(u, str) for u in value):
+        raise ValueError(f"{key} must be a list of usernames")
+
+def parse_setting(key, raw, kind):
+    if kind is str:
+        if not isinstance(raw, str):
+            raise ValueError(f"{key}: expected text, got {raw!r}")
+        return raw
+
+    # json.load accepts NaN and Infinity, and int() would quietly truncate 2.9
+    try:
+        value = float(raw)
+    except (TypeError, ValueError):
+        raise ValueError(f"{key}: bad value {raw!r}")
+    if isinstance(raw, bool) or not math.isfinite(value):
+        raise ValueError(f"{key}: bad value {raw!r}")
+    if kind is int:
+        if not value.is_integer():
+            raise ValueError(f"{key}: must be a whole number, got {raw!r}")
+        return int(value)
+    return value
+
+def parse_settings(config):
+    # everything is checked before anything is applied, so a bad value
+    # leaves the running settings untouched
+    settings = {}
+    for name in RELOADABLE_SETTINGS:
+        key = name.lower()
+        if key not in config:
+            continue
+        value = parse_setting(key, config[key], type(globals()[name]))
+        if isinstance(value, (int, float)) and (value < 0 or (value == 0 and name in POSITIVE_SETTINGS)):
+            raise ValueError(f"{key}: out of range {value!r}")
+        settings[name] = value
+
+    if settings.get("RATE_LIMIT_POLICY", RATE_LIMIT_POLICY) not in RATE_LIMIT_POLICIES:
+        raise ValueError(f"rate_limit_policy must be one of {', '.join(RATE_LIMIT_POLICIES)}")
+
+    if "admin_usernames" in config:
+        check_usernames("admin_usernames", config["admin_usernames"])
+        settings["ADMIN_USERNAMES"] = list(config["admin_usernames"])
+
+    try:
+        bots = read_bots(config)
+    except (TypeError, AttributeError):
+        raise ValueError("bots must be a list of objects")
+    for conf in bots:
+        check_usernames(f"bots.{conf['name']}.admin_usernames", conf.get("admin_usernames", []))
+    return settings, bots
+
+def apply_settings(settings, bots):
+    global admin_set
+
+    globals().update(settings)
+    admin_set = {u.lstrip("@").lower() for u in ADMIN_USERNAMES}
+
+    for conf in bots:
+        if conf["name"] in applications:
+            applications[conf["name"]].bot_data["admins"] = bot_admin_set(conf)
+
+def load_config():
+    global BOT_TOKEN, DB_NAME, BOTS
+
+    config = read_config()
+    settings, bots = parse_settings(config)
+    BOT_TOKEN = config.get("bot_token", BOT_TOKEN)
+    DB_NAME = config.get("db_name", DB_NAME)
+    apply_settings(settings, bots)
+    BOTS = bots
+
+def reload_config():
+    try:
+        config = read_config()
+        settings, bots = parse_settings(config)
+    except (OSError, ValueError) as e:
+        logger.error("Config reload failed, keeping old config: %s", e)
+        return
+
+    tokens = [conf.get("token") for conf in bots]
+    if tokens != [conf.get("token") for conf in BOTS] or config.get("db_name", DB_NAME) != DB_NAME:
+        logger.warning("bot token and db_name changes need a restart, ignoring them")
+
+    apply_settings(settings, bots)
+    logger.info("Config reloaded: %d admin(s)", len(admin_set))
+
+def install_reload_signal():
+    if hasattr(signal, "SIGHUP"):
+        asyncio.get_running_loop().add_signal_handler(signal.SIGHUP, reload_config)
+
 # ---------------------------------------------------------------------------
 # DATABASE
 # ---------------------------------------------------------------------------
@@ -906,7 +1240,9 @@ def init_db():
     c = conn.cursor()
 
     c.execute("""CREATE TABLE IF NOT EXISTS users
-        (chat_id INTEGER PRIMARY KEY, username TEXT, first_name TEXT)""")
+        (bot TEXT NOT NULL, chat_id INTEGER, username TEXT, first_name TEXT,
+         PRIMARY KEY (bot, chat_id))""")
+    migrate_users_bot(c, BOTS[0]["name"] if BOTS else DEFAULT_BOT_NAME)
 
     c.execute("""CREATE TABLE IF NOT EXISTS daily_classes
         (id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -916,24 +1252,700 @@ def init_db():
         (id INTEGER PRIMARY KEY AUTOINCREMENT,
          title TEXT, body TEXT, created_at TEXT)""")
 
+    c.execute("""CREATE TABLE IF NOT EXISTS outbox
+        (id INTEGER PRIMARY KEY AUTOINCREMENT,
+         chat_id INTEGER, kind TEXT, payload TEXT, priority INTEGER,
+         dedup_key TEXT, status INTEGER NOT NULL DEFAULT 0,
+         created_at REAL, expires_at REAL)""")
+    add_column(c, "outbox", "bot", "TEXT")
+    c.execute("DROP INDEX IF EXISTS idx_outbox_dedup")
+    c.execute("""CREATE UNIQUE INDEX IF NOT EXISTS idx_outbox_dedup_bot
+        ON outbox (dedup_key, bot, chat_id)""")
+    c.execute("""CREATE INDEX IF NOT EXISTS idx_outbox_status
+        ON outbox (status, priority, id)""")
+
+    c.execute("""CREATE TABLE IF NOT EXISTS stats_hourly
+        (hour TEXT, metric TEXT, key TEXT, count INTEGER NOT NULL,
+         PRIMARY KEY (hour, metric, key)) WITHOUT ROWID""")
+    c.execute("""CREATE TABLE IF NOT EXISTS stats_daily
+        (day TEXT, metric TEXT, key TEXT, count INTEGER NOT NULL,
+         PRIMARY KEY (day, metric, key)) WITHOUT ROWID""")
+    c.execute("""CREATE TABLE IF NOT EXISTS active_users
+        (day TEXT, chat_id INTEGER, PRIMARY KEY (day, chat_id)) WITHOUT ROWID""")
+
+    c.execute("""CREATE TABLE IF NOT EXISTS teachers
+        (id INTEGER PRIMARY KEY AUTOINCREMENT,
+         name TEXT COLLATE NOCASE, subject TEXT COLLATE NOCASE,
+         contact TEXT, email TEXT)""")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_teachers_name ON teachers (name)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_teachers_subject ON teachers (subject)")
+    if not c.execute("SELECT 1 FROM teachers LIMIT 1").fetchone():
+        c.executemany("INSERT INTO teachers (name, subject) VALUES (?, ?)", TEACHER_SEED)
+
     c.execute("""CREATE TABLE IF NOT EXISTS resources
         (id INTEGER PRIMARY KEY AUTOINCREMENT,
          file_id TEXT, file_type TEXT, caption TEXT, created_at TEXT)""")
 
+    # a file_id only works for the bot that received the file, so each bot
+    # keeps its own; resources without one for a bot are hidden from it
+    has_resource_files = c.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'resource_files'"
+    ).fetchone()
+    c.execute("""CREATE TABLE IF NOT EXISTS resource_files
+        (bot TEXT, file_unique_id TEXT, file_id TEXT,
+         PRIMARY KEY (bot, file_unique_id)) WITHOUT ROWID""")
+
+    # one uploaded image per bot and view, reused while the content hash matches
+    c.execute("""CREATE TABLE IF NOT EXISTS rendered_images
+        (bot TEXT, view TEXT, content_hash TEXT, file_id TEXT, created_at REAL,
+         PRIMARY KEY (bot, view)) WITHOUT ROWID""")
+
+    add_column(c, "users", "digest", "INTEGER NOT NULL DEFAULT 1")
+    add_column(c, "daily_classes", "day", "TEXT")
+    add_column(c, "notices", "digested", "INTEGER NOT NULL DEFAULT 1")
+    add_column(c, "resources", "file_unique_id", "TEXT")
+    add_column(c, "resources", "course", "TEXT")
+    add_column(c, "resources", "category", "TEXT")
+    c.execute("""CREATE UNIQUE INDEX IF NOT EXISTS idx_resources_unique
+        ON resources (file_unique_id)""")
+    c.execute("""CREATE INDEX IF NOT EXISTS idx_notices_pending
+        ON notices (digested, id)""")
+    c.execute("""CREATE INDEX IF NOT EXISTS idx_resources_course
+        ON resources (course, created_at)""")
+    if not has_resource_files:
+        # files stored before bots were tracked came in through the first bot
+        c.execute(
+            """INSERT OR IGNORE INTO resource_files (bot, file_unique_id, file_id)
+               SELECT ?, file_unique_id, file_id FROM resources WHERE file_unique_id IS NOT NULL""",
+            (BOTS[0]["name"] if BOTS else DEFAULT_BOT_NAME,)
+        )
+
     conn.commit()
     conn.close()
 
+def add_column(c, table, column, decl):
+    columns = [row[1] for row in c.execute(f"PRAGMA table_info({table})")]
+    if column not in columns:
+        c.execute(f"ALTER TABLE {table} ADD COLUMN {column} {decl}")
+
+def migrate_users_bot(c, default_bot):
+    # users used to be keyed on chat_id alone; rebuild it keyed on (bot, chat_id)
+    columns = [row[1] for row in c.execute("PRAGMA table_info(users)")]
+    if "bot" in columns:
+        return
+
+    c.execute("ALTER TABLE users RENAME TO users_old")
+    c.execute("""CREATE TABLE users
+        (bot TEXT NOT NULL, chat_id INTEGER, username TEXT, first_name TEXT,
+         digest INTEGER NOT NULL DEFAULT 1, PRIMARY KEY (bot, chat_id))""")
+    add_column(c, "users_old", "digest", "INTEGER NOT NULL DEFAULT 1")
+    c.execute(
+        """INSERT INTO users (bot, chat_id, username, first_name, digest)
+           SELECT ?, chat_id, username, first_name, digest FROM users_old""",
+        (default_bot,)
+    )
+    c.execute("DROP TABLE users_old")
+
 def get_db():
     return sqlite3.connect(DB_NAME)
 
-def is_admin(username):
+def is_admin(username, context=None):
     if not username:
         return False
-    return username.lower() in [u.lower() for u in ADMIN_USERNAMES]
+    admins = context.bot_data.get("admins", admin_set) if context else admin_set
+    return username.lstrip("@").lower() in admins
+
+def bot_name(context):
+    return context.bot_data.get("name", DEFAULT_BOT_NAME)
+
+def is_primary_bot(context):
+    return not BOTS or bot_name(context) == BOTS[0]["name"]
+
+def end_flow(context):
+    for key in FLOW_DATA_KEYS:
+        context.user_data.pop(key, None)
+    return ConversationHandler.END
+
+def today_code():
+    return WEEKDAYS[get_bd_time().weekday()]
 
 def get_bd_time():
     return datetime.datetime.now(BD_TZ)
 
+def validate_and_format_time(time_text):
+    try:
+        return datetime.datetime.strptime(time_text.strip(), "%H:%M").strftime("%H:%M")
+    except ValueError:
+        return None
+
+# ---------------------------------------------------------------------------
+# INBOUND RATE LIMIT
+# ---------------------------------------------------------------------------
+
+rate_buckets = OrderedDict()
+throttle_stats = {"allowed": 0, "dropped": 0, "delayed": 0, "warned": 0, "exempt": 0}
+
+# updates held back by the "delay" policy; they skip the limiter when they come back
+delayed_updates = set()
+
+async def redeliver(application, update, wait):
+    # sleeping here instead of in the handler keeps other users' updates flowing
+    await asyncio.sleep(wait)
+    delayed_updates.add(id(update))
+    try:
+        await application.process_update(update)
+    finally:
+        delayed_updates.discard(id(update))
+
+def evict_idle_buckets(now):
+    while rate_buckets:
+        user_id, bucket = next(iter(rate_buckets.items()))
+        if now - bucket[1] < RATE_LIMIT_IDLE:
+            break
+        del rate_buckets[user_id]
+
+def take_token(user_id, borrow=False):
+    now = time.monotonic()
+    evict_idle_buckets(now)
+
+    # bucket = [tokens, last_seen, warned]
+    bucket = rate_buckets.pop(user_id, None) or [float(RATE_LIMIT_BURST), now, False]
+    rate_buckets[user_id] = bucket
+
+    tokens = min(RATE_LIMIT_BURST, bucket[0] + (now - bucket[1]) * RATE_LIMIT_RATE)
+    bucket[1] = now
+
+    if tokens >= 1:
+        bucket[0] = tokens - 1
+        bucket[2] = False
+        return 0.0
+
+    wait = (1 - tokens) / RATE_LIMIT_RATE
+    bucket[0] = tokens - 1 if borrow and wait <= RATE_LIMIT_MAX_DELAY else tokens
+    return wait
+
+async def rate_limit(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    user = update.effective_user
+    if not user or id(update) in delayed_updates:
+        return
+
+    # read through the application mapping so unknown users get no user_data entry
+    if is_admin(user.username, context) or context.application.user_data.get(user.id, {}).get(FLOW_KEY):
+        throttle_stats["exempt"] += 1
+        return
+
+    wait = take_token(user.id, borrow=RATE_LIMIT_POLICY == "delay")
+    if not wait:
+        throttle_stats["allowed"] += 1
+        return
+
+    if RATE_LIMIT_POLICY == "delay" and wait <= RATE_LIMIT_MAX_DELAY:
+        throttle_stats["delayed"] += 1
+        context.application.create_task(redeliver(context.application, update, wait))
+        raise ApplicationHandlerStop
+
+    bucket = rate_buckets[user.id]
+    if update.callback_query:
+        # answering stops the button spinner without sending a message
+        throttle_stats["dropped"] += 1
+        await update.callback_query.answer("⏳ একটু ধীরে!", show_alert=True)
+    elif RATE_LIMIT_POLICY == "warn" and not bucket[2] and update.effective_message:
+        bucket[2] = True
+        throttle_stats["warned"] += 1
+        await reply(update, "⏳ একটু ধীরে! কিছুক্ষণ পর আবার চেষ্টা করো")
+    else:
+        throttle_stats["dropped"] += 1
+
+    raise ApplicationHandlerStop
+
+async def show_throttle_stats(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    if not is_admin(update.effective_user.username, context):
+        await reply(update, "⛔ শুধুমাত্র এডমিনদের জন্য")
+        return
+
+    msg = f"🚦 Rate limit ({RATE_LIMIT_POLICY}, {RATE_LIMIT_BURST} burst, {RATE_LIMIT_RATE}/s)\n\n"
+    for key, value in throttle_stats.items():
+        msg += f"{key}: {value}\n"
+    msg += f"tracked users: {len(rate_buckets)}"
+    await reply(update, msg)
+
+# ---------------------------------------------------------------------------
+# OUTBOUND SCHEDULER
+# ---------------------------------------------------------------------------
+
+# heap of (priority, seq, job); job = (priority, chat_id, send, enqueued, deadline, future)
+outbound_queue = []
+# heap of (ready_at, entry) for bulk jobs whose chat is still cooling down
+outbound_parked = []
+outbound_chat_next = {}
+outbound_seq = itertools.count()
+outbound_wakeup = asyncio.Event()
+outbound_state = {"next_send": 0.0, "worker": None}
+outbound_stats = [
+    {"sent": 0, "failed": 0, "dropped": 0, "latency": 0.0, "max": 0.0}
+    for _ in PRIORITY_NAMES
+]
+
+def schedule_send(chat_id, send, priority=PRIO_REPLY, timeout=None):
+    now = time.monotonic()
+    deadline = now + timeout if timeout is not None else None
+    future = asyncio.get_running_loop().create_future()
+    job = (priority, chat_id, send, now, deadline, future)
+    heapq.heappush(outbound_queue, (priority, next(outbound_seq), job))
+    outbound_wakeup.set()
+    return future
+
+async def reply(update, text, **kwargs):
+    message = update.effective_message
+    return await schedule_send(message.chat_id, lambda: message.reply_text(text, **kwargs))
+
+def pop_ready_job(now):
+    while outbound_parked and outbound_parked[0][0] <= now:
+        heapq.heappush(outbound_queue, heapq.heappop(outbound_parked)[1])
+
+    while outbound_queue:
+        entry = heapq.heappop(outbound_queue)
+        priority, chat_id, _, _, deadline, future = job = entry[2]
+
+        if future.done():
+            continue
+        if deadline is not None and now > deadline:
+            outbound_stats[priority]["dropped"] += 1
+            record_event("send_dropped", PRIORITY_NAMES[priority])
+            future.set_exception(TimeoutError("outbound deadline passed"))
+            continue
+
+        ready_at = outbound_chat_next.get(chat_id, 0.0)
+        if priority != PRIO_REPLY and ready_at > now:
+            heapq.heappush(outbound_parked, (ready_at, entry))
+            continue
+        return job
+    return None
+
+async def run_outbound_job(job, slots):
+    priority, chat_id, send, _, _, future = job
+    try:
+        result = await send()
+        outbound_stats[priority]["sent"] += 1
+        record_event("send_ok", PRIORITY_NAMES[priority])
+        if not future.done():
+            future.set_result(result)
+    except RetryAfter as e:
+        outbound_state["next_send"] = time.monotonic() + e.retry_after
+        heapq.heappush(outbound_queue, (priority, next(outbound_seq), job))
+        outbound_wakeup.set()
+    except Exception as e:
+        outbound_stats[priority]["failed"] += 1
+        record_event("send_failed", PRIORITY_NAMES[priority])
+        log_send_failure(chat_id, e)
+        if not future.done():
+            future.set_exception(e)
+    finally:
+        slots.release()
+
+async def outbound_worker():
+    slots = asyncio.Semaphore(OUTBOUND_CONCURRENCY)
+    while True:
+        await slots.acquire()
+        delay = outbound_state["next_send"] - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+        # pick the job only once a send slot is free, so late urgent work still wins
+        outbound_wakeup.clear()
+        now = time.monotonic()
+        job = pop_ready_job(now)
+        if job is None:
+            slots.release()
+            timeout = outbound_parked[0][0] - now if outbound_parked else None
+            try:
+                await asyncio.wait_for(outbound_wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+            continue
+
+        priority, chat_id, _, enqueued, _, _ = job
+        outbound_state["next_send"] = max(now, outbound_state["next_send"]) + 1 / OUTBOUND_RATE
+        outbound_chat_next[chat_id] = now + OUTBOUND_CHAT_INTERVAL
+
+        stats = outbound_stats[priority]
+        latency = now - enqueued
+        stats["latency"] += latency
+        stats["max"] = max(stats["max"], latency)
+
+        asyncio.create_task(run_outbound_job(job, slots))
+
+        if len(outbound_chat_next) > 10000:
+            for key in [k for k, t in outbound_chat_next.items() if t <= now]:
+                del outbound_chat_next[key]
+
+async def start_outbound(bots):
+    if not outbound_state["worker"]:
+        outbound_state["worker"] = asyncio.create_task(outbound_worker())
+
+    if not outbound_state.get("outbox"):
+        uncertain = await asyncio.to_thread(recover_outbox)
+        if uncertain:
+            logger.warning("Outbox: %d message(s) were in flight at shutdown, marked failed", uncertain)
+        outbound_state["outbox"] = asyncio.create_task(outbox_drainer(bots))
+
+async def stop_outbound():
+    for key in ("outbox", "worker"):
+        if outbound_state.get(key):
+            outbound_state[key].cancel()
+            outbound_state[key] = None
+
+async def show_queue_stats(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    if not is_admin(update.effective_user.username, context):
+        await reply(update, "⛔ শুধুমাত্র এডমিনদের জন্য")
+        return
+
+    with get_db() as conn:
+        counts = dict(conn.execute("SELECT status, COUNT(*) FROM outbox GROUP BY status").fetchall())
+
+    msg = f"📤 Outbound queue: {len(outbound_queue)} waiting, {len(outbound_parked)} parked\n"
+    msg += "📦 Outbox: " + ", ".join(
+        f"{name} {counts.get(status, 0)}" for status, name in enumerate(OUTBOX_STATUS_NAMES)
+    ) + "\n\n"
+    for name, stats in zip(PRIORITY_NAMES, outbound_stats):
+        started = stats["sent"] + stats["failed"]
+        avg = stats["latency"] / started if started else 0.0
+        msg += (
+            f"{name}: sent {stats['sent']}, failed {stats['failed']}, dropped {stats['dropped']}, "
+            f"avg wait {avg:.2f}s, max {stats['max']:.2f}s\n"
+        )
+    await reply(update, msg)
+
+# ---------------------------------------------------------------------------
+# OUTBOX
+# ---------------------------------------------------------------------------
+
+# Bulk sends are written to the outbox inside the same transaction as the
+# data that caused them; the drainer feeds them to the scheduler in batches.
+# Rows claimed but not confirmed before a crash are marked failed on restart
+# rather than resent, so a message is never delivered twice.
+
+outbox_wakeup = asyncio.Event()
+
+def enqueue_outbox(conn, audience, kind, payload, priority, expires_at=None, dedup_key=None, bot=None):
+    # bot=None reaches the users of every bot, each through the bot they joined
+    cur = conn.execute(
+        f"""INSERT OR IGNORE INTO outbox
+            (bot, chat_id, kind, payload, priority, dedup_key, created_at, expires_at)
+            SELECT bot, chat_id, ?, ?, ?, ?, ?, ? FROM users
+            WHERE {OUTBOX_AUDIENCES[audience]} AND (? IS NULL OR bot = ?)""",
+        (kind, payload, priority, dedup_key, time.time(), expires_at, bot, bot)
+    )
+    return cur.rowcount
+
+def recover_outbox():
+    with get_db() as conn:
+        return conn.execute(
+            "UPDATE outbox SET status = ? WHERE status = ?", (OUTBOX_FAILED, OUTBOX_SENDING)
+        ).rowcount
+
+def claim_outbox_batch():
+    with get_db() as conn:
+        return conn.execute(
+            """UPDATE outbox SET status = ? WHERE id IN
+               (SELECT id FROM outbox WHERE status = ? ORDER BY priority, id LIMIT ?)
+               RETURNING id, bot, chat_id, kind, payload, priority, expires_at""",
+            (OUTBOX_SENDING, OUTBOX_PENDING, OUTBOX_BATCH)
+        ).fetchall()
+
+def finish_outbox_rows(done_ids, failed_ids):
+    with get_db() as conn:
+        conn.executemany(
+            "UPDATE outbox SET status = ? WHERE id = ? AND status = ?",
+            [(OUTBOX_DONE, row_id, OUTBOX_SENDING) for row_id in done_ids]
+            + [(OUTBOX_FAILED, row_id, OUTBOX_SENDING) for row_id in failed_ids]
+        )
+
+def prune_outbox():
+    with get_db() as conn:
+        return conn.execute(
+            "DELETE FROM outbox WHERE status IN (?, ?) AND created_at < ?",
+            (OUTBOX_DONE, OUTBOX_FAILED, time.time() - OUTBOX_RETENTION)
+        ).rowcount
+
+def outbox_send(bot, chat_id, kind, payload):
+    if bot is None:
+        async def missing_bot():
+            raise LookupError("bot for this outbox row is not configured")
+        return missing_bot
+    if kind == "copy":
+        from_chat_id, message_id = json.loads(payload)
+        return lambda: bot.copy_message(chat_id, from_chat_id, message_id)
+    return lambda: bot.send_message(chat_id, payload)
+
+async def send_outbox_batch(bots, rows, slots):
+    try:
+        now = time.time()
+        futures = [
+            schedule_send(
+                chat_id,
+                outbox_send(bots.get(name), chat_id, kind, payload),
+                priority,
+                expires_at - now if expires_at else None,
+            )
+            for _, name, chat_id, kind, payload, priority, expires_at in rows
+        ]
+        results = await asyncio.gather(*futures, return_exceptions=True)
+
+        done, failed = [], []
+        for row, result in zip(rows, results):
+            (failed if isinstance(result, BaseException) else done).append(row[0])
+        await asyncio.to_thread(finish_outbox_rows, done, failed)
+    finally:
+        slots.release()
+
+async def outbox_drainer(bots):
+    slots = asyncio.Semaphore(OUTBOX_INFLIGHT)
+    while True:
+        await slots.acquire()
+        outbox_wakeup.clear()
+        try:
+            rows = await asyncio.to_thread(claim_outbox_batch)
+        except Exception as e:
+            logger.error("Error claiming outbox batch: %s", e)
+            rows = []
+
+        if not rows:
+            slots.release()
+            try:
+                await asyncio.wait_for(outbox_wakeup.wait(), OUTBOX_POLL)
+            except asyncio.TimeoutError:
+                pass
+            continue
+
+        asyncio.create_task(send_outbox_batch(bots, rows, slots))
+
+async def prune_outbox_job(context: ContextTypes.DEFAULT_TYPE):
+    try:
+        removed = await asyncio.to_thread(prune_outbox)
+        if removed:
+            logger.info("Outbox: pruned %d old row(s)", removed)
+    except Exception as e:
+        logger.error("Error in prune_outbox_job: %s", e)
+
+# ---------------------------------------------------------------------------
+# USAGE ANALYTICS
+# ---------------------------------------------------------------------------
+
+# events are counted in memory and folded into the rollup tables by flush_stats()
+stats_buffer = Counter()
+stats_active = set()
+stats_seen = {"day": None, "users": set()}
+
+def record_event(metric, key=""):
+    stats_buffer[(get_bd_time().strftime("%Y-%m-%d %H"), metric, key)] += 1
+
+def record_active(chat_id):
+    day = get_bd_time().strftime("%Y-%m-%d")
+    if stats_seen["day"] != day:
+        stats_seen["day"] = day
+        stats_seen["users"] = set()
+    if chat_id not in stats_seen["users"]:
+        stats_seen["users"].add(chat_id)
+        stats_active.add((day, chat_id))
+
+def flush_stats(counts, active):
+    hourly = [(hour, metric, key, n) for (hour, metric, key), n in counts.items()]
+    daily = Counter()
+    for (hour, metric, key), n in counts.items():
+        daily[(hour[:10], metric, key)] += n
+
+    with get_db() as conn:
+        for day, chat_id in active:
+            # only first sightings of the day bump the active-user rollup
+            if conn.execute(
+                "INSERT OR IGNORE INTO active_users (day, chat_id) VALUES (?, ?)", (day, chat_id)
+            ).rowcount:
+                daily[(day, "active_users", "")] += 1
+
+        conn.executemany(
+            """INSERT INTO stats_hourly (hour, metric, key, count) VALUES (?, ?, ?, ?)
+               ON CONFLICT (hour, metric, key) DO UPDATE SET count = count + excluded.count""",
+            hourly
+        )
+        conn.executemany(
+            """INSERT INTO stats_daily (day, metric, key, count) VALUES (?, ?, ?, ?)
+               ON CONFLICT (day, metric, key) DO UPDATE SET count = count + excluded.count""",
+            [(day, metric, key, n) for (day, metric, key), n in daily.items()]
+        )
+
+def prune_stats():
+    now = get_bd_time()
+    hour_cutoff = (now - datetime.timedelta(days=STATS_HOURLY_RETENTION)).strftime("%Y-%m-%d %H")
+    day_cutoff = (now - datetime.timedelta(days=ACTIVE_USERS_RETENTION)).strftime("%Y-%m-%d")
+    with get_db() as conn:
+        hourly = conn.execute("DELETE FROM stats_hourly WHERE hour < ?", (hour_cutoff,)).rowcount
+        active = conn.execute("DELETE FROM active_users WHERE day < ?", (day_cutoff,)).rowcount
+    return hourly + active
+
+async def prune_stats_job(context: ContextTypes.DEFAULT_TYPE):
+    try:
+        removed = await asyncio.to_thread(prune_stats)
+        if removed:
+            logger.info("Stats: pruned %d old row(s)", removed)
+    except Exception as e:
+        logger.error("Error in prune_stats_job: %s", e)
+
+async def stats_flush_job(context: ContextTypes.DEFAULT_TYPE):
+    global stats_buffer, stats_active
+    if not stats_buffer and not stats_active:
+        return
+
+    counts, active = stats_buffer, stats_active
+    stats_buffer, stats_active = Counter(), set()
+    try:
+        await asyncio.to_thread(flush_stats, counts, active)
+    except Exception as e:
+        logger.error("Error in stats_flush_job: %s", e)
+
+async def track_update(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    if id(update) in delayed_updates:
+        return
+    if update.effective_user:
+        record_active(update.effective_user.id)
+        touch(user_last_seen, update.effective_user.id)
+    if update.effective_chat:
+        touch(chat_last_seen, update.effective_chat.id)
+
+    message = update.message
+    if update.inline_query:
+        record_event("inline")
+    elif update.callback_query:
+        view = (update.callback_query.data or "").split(":")[0]
+        record_event("nav", view if view in NAV_VIEWS or view == "rf" else "other")
+    elif message and message.text:
+        text = message.text.strip()
+        if text.startswith("/"):
+            command = text.split()[0].split("@")[0].lower()
+            record_event("command", command if command in STATS_COMMANDS else "other")
+        else:
+            record_event("button", text if text in MENU_BUTTONS else "other")
+    elif message:
+        record_event("upload")
+
+async def show_stats(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    if not is_admin(update.effective_user.username, context):
+        await reply(update, "⛔ শুধুমাত্র এডমিনদের জন্য")
+        return
+
+    now = get_bd_time()
+    day = now.strftime("%Y-%m-%d")
+    hour = now.strftime("%Y-%m-%d %H")
+
+    with get_db() as conn:
+        daily = conn.execute(
+            "SELECT metric, key, count FROM stats_daily WHERE day = ?", (day,)
+        ).fetchall()
+        hourly = conn.execute(
+            "SELECT metric, SUM(count) FROM stats_hourly WHERE hour = ? GROUP BY metric", (hour,)
+        ).fetchall()
+
+    totals = Counter()
+    buttons = Counter()
+    for metric, key, count in daily:
+        totals[metric] += count
+        if metric in ("button", "command"):
+            buttons[key] += count
+
+    msg = f"📊 আজকের পরিসংখ্যান ({day})\n\n"
+    msg += f"👥 সক্রিয় ইউজার: {totals['active_users']}\n"
+    msg += f"📤 পাঠানো: {totals['send_ok']}, ব্যর্থ: {totals['send_failed']}, বাদ: {totals['send_dropped']}\n"
+    msg += f"🔎 inline: {totals['inline']}, আপলোড: {totals['upload']}\n"
+    msg += "\n🔝 জনপ্রিয় বাটন/কমান্ড:\n"
+    for key, count in buttons.most_common(STATS_TOP):
+        msg += f"{key}: {count}\n"
+    msg += "\n⏱ এই ঘণ্টা: " + (", ".join(f"{m} {n}" for m, n in hourly) or "—")
+    await reply(update, msg)
+
+# ---------------------------------------------------------------------------
+# MEMORY: STATE EVICTION
+# ---------------------------------------------------------------------------
+
+# least recently seen first, so idle users are evicted from the front
+user_last_seen = OrderedDict()
+chat_last_seen = OrderedDict()
+
+def touch(seen, key):
+    seen.pop(key, None)
+    seen[key] = time.monotonic()
+
+def evict_idle(seen, drop, now):
+    dropped = 0
+    while seen:
+        key, last = next(iter(seen.items()))
+        if now - last < USER_DATA_TTL and len(seen) <= USER_DATA_MAX:
+            break
+        del seen[key]
+        drop(key)
+        dropped += 1
+    return dropped
+
+# Without persistence PTB still remembers every dropped id for a later
+# persistence flush, so only ids that actually hold data are dropped.
+def drop_user_everywhere(user_id):
+    for app in applications.values():
+        if user_id in app.user_data:
+            app.drop_user_data(user_id)
+
+def drop_chat_everywhere(chat_id):
+    for app in applications.values():
+        if chat_id in app.chat_data:
+            app.drop_chat_data(chat_id)
+
+async def evict_state_job(context: ContextTypes.DEFAULT_TYPE):
+    now = time.monotonic()
+    users = evict_idle(user_last_seen, drop_user_everywhere, now)
+    chats = evict_idle(chat_last_seen, drop_chat_everywhere, now)
+    if users or chats:
+        logger.info("Evicted idle state: %d user(s), %d chat(s)", users, chats)
+
+async def flow_timeout(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    end_flow(context)
+    if update.effective_message:
+        await reply(update, "⌛ অনেকক্ষণ কোনো উত্তর নেই, কাজটি বাতিল করা হয়েছে")
+
+def process_rss_mb():
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+async def show_memory(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    if not is_admin(update.effective_user.username, context):
+        await reply(update, "⛔ শুধুমাত্র এডমিনদের জন্য")
+        return
+
+    app = context.application
+    sizes = {
+        "user_data": len(app.user_data),
+        "chat_data": len(app.chat_data),
+        "tracked users": len(user_last_seen),
+        "tracked chats": len(chat_last_seen),
+        "rate buckets": len(rate_buckets),
+        "chat send times": len(outbound_chat_next),
+        "search docs": len(search_docs),
+        "search tokens": len(search_tokens),
+        "seen today": len(stats_seen["users"]),
+        "nav views": len(nav_views),
+        # PTB keeps these ids until a persistence flush, which never comes here
+        "dropped user ids": len(getattr(app, "_user_ids_to_be_deleted_in_persistence", ())),
+        "dropped chat ids": len(getattr(app, "_chat_ids_to_be_deleted_in_persistence", ())),
+    }
+    msg = f"🧠 RSS: {process_rss_mb():.1f} MB\n\n"
+    msg += "\n".join(f"{name}: {count}" for name, count in sizes.items())
+    msg += f"\n\nTTL {USER_DATA_TTL // 60} min, max {USER_DATA_MAX} users"
+    await reply(update, msg)
+
 # ---------------------------------------------------------------------------
 # START & MENU
 # ---------------------------------------------------------------------------
@@ -943,8 +1955,8 @@ async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
     with get_db() as conn:
         conn.execute(
-            "INSERT OR IGNORE INTO users VALUES (?, ?, ?)",
-            (user.id, user.username, user.first_name)
+            "INSERT OR IGNORE INTO users (bot, chat_id, username, first_name) VALUES (?, ?, ?, ?)",
+            (bot_name(context), user.id, user.username, user.first_name)
         )
 
     buttons = [
@@ -953,18 +1965,21 @@ async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
         [KeyboardButton("📂 View Resources")]
     ]
 
-    if is_admin(user.username):
+    if is_admin(user.username, context):
         buttons.append([KeyboardButton("⚙ Add Today Class"), KeyboardButton("⚙ Add Notice")])
         buttons.append([KeyboardButton("⚙ Add Resources"), KeyboardButton("⚙ Broadcast")])
+        if is_primary_bot(context):
+            buttons.append([KeyboardButton("⚙ Import Classes")])
 
-    await update.message.reply_text(
+    await reply(
+        update,
         "✅ ইউনিভার্সিটি বটে স্বাগতম!",
         reply_markup=ReplyKeyboardMarkup(buttons, resize_keyboard=True)
     )
 
 async def cancel(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    await update.message.reply_text("❌ বাতিল করা হয়েছে")
-    return ConversationHandler.END
+    await reply(update, "❌ বাতিল করা হয়েছে")
+    return end_flow(context)
 
 # ---------------------------------------------------------------------------
 # USER FEATURES
@@ -972,34 +1987,1192 @@ async def cancel(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
 async def show_today_classes(update: Update, context: ContextTypes.DEFAULT_TYPE):
     with get_db() as conn:
-        classes = conn.execute("SELECT * FROM daily_classes").fetchall()
+        classes = conn.execute(
+            """SELECT time_str, course, room, teacher FROM daily_classes
+               WHERE day IS NULL OR day = ? ORDER BY time_str, id""",
+            (today_code(),)
+        ).fetchall()
 
     if not classes:
-        await update.message.reply_text("✅ আজ কোনো ক্লাস নেই")
+        await reply(update, "✅ আজ কোনো ক্লাস নেই")
+        return
+
+    try:
+        await send_timetable(update, context, "today", "Today's Classes", classes)
         return
+    except ImportError:
+        pass
 
     msg = "🗓 আজকের ক্লাস:\n\n"
-    for _, time_, course, room, teacher in classes:
+    for time_, course, room, teacher in classes:
         msg += f"⏰ {time_} | {course} | {room} | {teacher}\n"
 
-    await update.message.reply_text(msg)
+    await reply(update, msg)
+
+async def show_full_routine(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    with get_db() as conn:
+        classes = conn.execute(
+            "SELECT day, time_str, course, room, teacher FROM daily_classes"
+        ).fetchall()
+
+    if not classes:
+        await reply(update, "📭 কোনো রুটিন নেই")
+        return
+
+    # classes without a day run every day and are listed first
+    order = {day: n for n, day in enumerate(ROUTINE_WEEK)}
+    classes.sort(key=lambda row: (order.get(row[0], -1), row[1]))
+
+    try:
+        rows = [(day.title() if day else "Daily", *rest) for day, *rest in classes]
+        await send_timetable(update, context, "week", "Weekly Routine", rows, ("Day",) + TIMETABLE_HEADER)
+        return
+    except ImportError:
+        pass
+
+    msg = "📅 সাপ্তাহিক রুটিন:\n"
+    for day, group in itertools.groupby(classes, key=lambda row: row[0]):
+        msg += f"\n{WEEKDAY_NAMES_BN[WEEKDAYS.index(day)] if day else 'প্রতিদিন'}:\n"
+        for _, time_, course, room, teacher in group:
+            msg += f"⏰ {time_} | {course} | {room} | {teacher}\n"
+
+    await reply(update, msg[:MAX_MESSAGE_CHARS])
 
 async def show_teachers(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    await update.message.reply_text(TEACHER_LIST_TEXT)
+    await reply(update, render_teacher_list())
 
 async def show_notices(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    await send_nav_view(update, context, *notices_view(bot_name(context), "", 0))
+
+# ---------------------------------------------------------------------------
+# TIMETABLE IMAGES
+# ---------------------------------------------------------------------------
+
+# Rendered PNGs are keyed by a hash of what they show. After the first upload
+# the Telegram file_id is stored, so an unchanged schedule is a single
+# send_photo by id with no drawing or upload.
+
+# view -> (content hash, PNG bytes) of its last render, so other bots can upload it too
+timetable_png = {}
+
+def timetable_hash(title, header, rows):
+    data = json.dumps([TIMETABLE_VERSION, title, header, rows], ensure_ascii=False)
+    return hashlib.sha256(data.encode("utf-8")).hexdigest()
+
+def render_timetable(title, header, rows):
+    from PIL import Image, ImageDraw, ImageFont
+
+    try:
+        font = ImageFont.truetype(TIMETABLE_FONT, TIMETABLE_FONT_SIZE)
+    except OSError:
+        font = ImageFont.load_default(size=TIMETABLE_FONT_SIZE)
+
+    pad = TIMETABLE_PADDING
+    line = TIMETABLE_FONT_SIZE + pad
+    table = [tuple(header)]
+    table += [tuple(str(value or "") for value in row) for row in rows]
+
+    measure = ImageDraw.Draw(Image.new("RGB", (1, 1)))
+    widths = [
+        int(max(measure.textlength(row[col], font=font) for row in table)) + 2 * pad
+        for col in range(len(table[0]))
+    ]
+    width = max(sum(widths), int(measure.textlength(title, font=font)) + 2 * pad)
+
+    image = Image.new("RGB", (width, line * (len(table) + 1) + pad), "white")
+    draw = ImageDraw.Draw(image)
+    draw.text((pad, pad), title, fill="black", font=font)
+
+    for n, row in enumerate(table, start=1):
+        top = line * n + pad // 2
+        if n == 1:
+            draw.rectangle((0, top, width, top + line), fill="#dfe7f2")
+        elif n % 2:
+            draw.rectangle((0, top, width, top + line), fill="#f4f6f8")
+        x = 0
+        for col, value in enumerate(row):
+            draw.text((x + pad, top + pad // 2), value, fill="black", font=font)
+            x += widths[col]
+
+    out = io.BytesIO()
+    image.save(out, format="PNG", optimize=True)
+    return out.getvalue()
+
+async def send_timetable(update, context, view, title, rows, header=TIMETABLE_HEADER):
+    message = update.effective_message
+    bot = bot_name(context)
+    digest = timetable_hash(title, header, rows)
+
+    with get_db() as conn:
+        cached = conn.execute(
+            "SELECT file_id FROM rendered_images WHERE bot = ? AND view = ? AND content_hash = ?",
+            (bot, view, digest)
+        ).fetchone()
+
+    if cached:
+        try:
+            await schedule_send(message.chat_id, lambda: message.reply_photo(cached[0]))
+            return
+        except BadRequest as e:
+            logger.warning("Cached %s timetable rejected, uploading again: %s", view, e)
+
+    last_digest, png = timetable_png.get(view, (None, None))
+    if last_digest != digest:
+        png = await asyncio.to_thread(render_timetable, title, header, rows)
+        timetable_png[view] = (digest, png)
+        record_event("timetable_render", view)
+
+    sent = await schedule_send(message.chat_id, lambda: message.reply_photo(png))
+    with get_db() as conn:
+        conn.execute(
+            "INSERT OR REPLACE INTO rendered_images VALUES (?, ?, ?, ?, ?)",
+            (bot, view, digest, sent.photo[-1].file_id, time.time())
+        )
+
+# ---------------------------------------------------------------------------
+# ADMIN: BULK SCHEDULE IMPORT
+# ---------------------------------------------------------------------------
+
+def iter_csv_rows(buf):
+    text = io.TextIOWrapper(buf, encoding="utf-8-sig", newline="")
+    yield from csv.reader(text)
+
+def iter_xlsx_rows(buf):
+    from openpyxl import load_workbook
+
+    wb = load_workbook(buf, read_only=True, data_only=True)
+    try:
+        for row in wb.active.iter_rows(values_only=True):
+            yield row
+    finally:
+        wb.close()
+
+def cell_text(value):
+    if value is None:
+        return ""
+    if isinstance(value, (datetime.time, datetime.datetime)):
+        return value.strftime("%H:%M")
+    return str(value).strip()
+
+def parse_schedule_rows(rows, rejected):
+    for line_no, row in enumerate(rows, start=1):
+        cells = [cell_text(v) for v in row]
+        if not any(cells):
+            continue
+        if line_no == 1 and cells[0].lower() == "time":
+            continue
+
+        cells += [""] * (5 - len(cells))
+        time_str = validate_and_format_time(cells[0])
+        course, room, teacher = cells[1:4]
+        day = DAY_ALIASES.get(cells[4].lower()) if cells[4] else None
+
+        if not (time_str and course and room) or (cells[4] and not day):
+            rejected.append(line_no)
+            continue
+
+        yield (time_str, course, room, teacher, day)
+
+async def import_schedule_start(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    if not is_admin(update.effective_user.username, context):
+        await reply(update, "⛔ শুধুমাত্র এডমিনদের জন্য")
+        return ConversationHandler.END
+    # the routine is shared by every bot, so one bot owns it
+    if not is_primary_bot(context):
+        await reply(update, "⛔ রুটিন শুধু মূল বট থেকে ইমপোর্ট করা যায়")
+        return ConversationHandler.END
+
+    await reply(
+        update,
+        "📥 রুটিন ফাইল পাঠাও (CSV বা XLSX)\n"
+        "কলাম: time, course, room, teacher, day (Ex: 09:30, CSE 101, 301, Asad Sir, Sun)\n"
+        "day খালি রাখলে ক্লাসটি প্রতিদিন দেখাবে\n\n"
+        "⚠ নতুন ফাইল আগের পুরো রুটিন বদলে দেবে"
+    )
+    context.user_data[FLOW_KEY] = "import"
+    return IMPORT_SCHEDULE_FILE
+
+async def import_schedule_finish(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    doc = update.message.document
+    name = (doc.file_name or "").lower()
+
+    if name.endswith(".csv"):
+        reader = iter_csv_rows
+    elif name.endswith(".xlsx"):
+        reader = iter_xlsx_rows
+    else:
+        await reply(update, "❌ শুধু .csv বা .xlsx ফাইল দাও")
+        return IMPORT_SCHEDULE_FILE
+
+    if doc.file_size and doc.file_size > MAX_IMPORT_BYTES:
+        await reply(update, "❌ ফাইল অনেক বড় (সর্বোচ্চ 1 MB)")
+        return end_flow(context)
+
+    buf = io.BytesIO()
+    tg_file = await doc.get_file()
+    await tg_file.download_to_memory(buf)
+    buf.seek(0)
+
+    rejected = []
+    try:
+        rows = list(parse_schedule_rows(reader(buf), rejected))
+        # the file is the whole routine, so it replaces the old one in the same
+        # transaction; a file with no usable rows leaves the old routine alone
+        if rows:
+            with get_db() as conn:
+                conn.execute("DELETE FROM daily_classes")
+                conn.executemany(
+                    "INSERT INTO daily_classes (time_str, course, room, teacher, day) VALUES (?, ?, ?, ?, ?)",
+                    rows,
+                )
+            reindex_classes()
+        accepted = len(rows)
+    except ImportError:
+        await reply(update, "❌ XLSX পড়ার জন্য openpyxl ইনস্টল করা নেই, CSV দাও")
+        return end_flow(context)
+    except Exception as e:
+        logger.error("Error importing schedule: %s", e)
+        await reply(update, "❌ ফাইল পড়তে সমস্যা হয়েছে, কিছুই সেভ হয়নি")
+        return end_flow(context)
+
+    msg = f"✅ ইমপোর্ট শেষ\n\nগৃহীত: {accepted}\nবাতিল: {len(rejected)}"
+    if rejected:
+        shown = ", ".join(str(n) for n in rejected[:MAX_REJECTED_SHOWN])
+        if len(rejected) > MAX_REJECTED_SHOWN:
+            shown += ", ..."
+        msg += f"\nবাতিল লাইন: {shown}"
+
+    await reply(update, msg)
+    return end_flow(context)
+
+# ---------------------------------------------------------------------------
+# BACKUP & EXPORT
+# ---------------------------------------------------------------------------
+
+def backup_prefix():
+    return os.path.splitext(os.path.basename(DB_NAME))[0]
+
+def backup_db():
+    os.makedirs(BACKUP_DIR, exist_ok=True)
+    stamp = get_bd_time().strftime("%Y%m%d-%H%M%S")
+    final_path = os.path.join(BACKUP_DIR, f"{backup_prefix()}-{stamp}.db")
+    tmp_path = final_path + ".part"
+
+    src = sqlite3.connect(DB_NAME)
+    dst = sqlite3.connect(tmp_path)
+    try:
+        src.backup(dst, pages=BACKUP_PAGES, sleep=BACKUP_SLEEP)
+    finally:
+        dst.close()
+        src.close()
+    os.replace(tmp_path, final_path)
+
+    pattern = glob.escape(backup_prefix()) + "-" + "[0-9]" * 8 + "-" + "[0-9]" * 6 + ".db"
+    old = sorted(glob.glob(os.path.join(BACKUP_DIR, pattern)))[:-BACKUP_KEEP]
+    for path in old:
+        os.remove(path)
+    return final_path
+
+async def backup_job(context: ContextTypes.DEFAULT_TYPE):
+    try:
+        path = await asyncio.to_thread(backup_db)
+        logger.info("Database backup written to %s", path)
+    except Exception as e:
+        logger.error("Error in backup_job: %s", e)
+
+def write_export(table, fmt, out):
+    with gzip.GzipFile(fileobj=out, mode="wb") as gz, \
+            io.TextIOWrapper(gz, encoding="utf-8", newline="") as text, \
+            get_db() as conn:
+        cur = conn.execute(EXPORT_TABLES[table])
+        columns = [d[0] for d in cur.description]
+
+        if fmt == "csv":
+            writer = csv.writer(text)
+            writer.writerow(columns)
+        else:
+            text.write("[")
+
+        first = True
+        while True:
+            rows = cur.fetchmany(EXPORT_BATCH)
+            if not rows:
+                break
+            for row in rows:
+                if fmt == "csv":
+                    writer.writerow(row)
+                else:
+                    text.write(("\n" if first else ",\n") + json.dumps(dict(zip(columns, row)), ensure_ascii=False))
+                first = False
+
+        if fmt == "json":
+            text.write("\n]\n")
+    out.seek(0)
+
+async def export_data(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    if not is_admin(update.effective_user.username, context):
+        await reply(update, "⛔ শুধুমাত্র এডমিনদের জন্য")
+        return
+
+    args = [a.lower() for a in context.args]
+    fmt = "json" if "json" in args else "csv"
+    tables = [a for a in args if a in EXPORT_TABLES] or list(EXPORT_TABLES)
+
+    for table in tables:
+        with tempfile.TemporaryFile() as out:
+            try:
+                await asyncio.to_thread(write_export, table, fmt, out)
+            except Exception as e:
+                logger.error("Error exporting %s: %s", table, e)
+                await reply(update, f"❌ {table} এক্সপোর্ট করতে সমস্যা হয়েছে")
+                continue
+
+            def send_export():
+                # a RetryAfter runs this again after the first try read the file to the end
+                out.seek(0)
+                return update.message.reply_document(document=out, filename=f"{table}.{fmt}.gz")
+
+            await schedule_send(update.effective_chat.id, send_export)
+
+# ---------------------------------------------------------------------------
+# RESOURCE LIBRARY
+# ---------------------------------------------------------------------------
+
+def normalize_course(text):
+    return " ".join(text.upper().split())
+
+def parse_resource_args(args):
+    # course names end in numbers, so the page is written as p2, p3, ...
+    page = 1
+    if args and args[-1].lower().startswith("p") and args[-1][1:].isdigit():
+        page = max(int(args[-1][1:]), 1)
+        args = args[:-1]
+    category = None
+    if args and args[-1].lower() in RESOURCE_CATEGORIES:
+        category = args[-1].lower()
+        args = args[:-1]
+    return normalize_course(" ".join(args)), category, page
+
+async def add_res_start(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    if not is_admin(update.effective_user.username, context):
+        await reply(update, "⛔ শুধুমাত্র এডমিনদের জন্য")
+        return ConversationHandler.END
+
+    await reply(
+        update,
+        "📂 ফাইল বা ছবি পাঠাও, ক্যাপশনে লিখো:\n"
+        "কোর্স | টাইপ | বিবরণ (Ex: CSE 101 | lab | Lab sheet 1)\n\n"
+        f"টাইপ: {', '.join(RESOURCE_CATEGORIES)}\n"
+        "শেষ হলে /done"
+    )
+    context.user_data[FLOW_KEY] = "resource"
+    return ADD_RESOURCE_FILE
+
+async def add_res_finish(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    msg = update.message
+
+    if msg.document:
+        media, file_type = msg.document, "doc"
+    elif msg.photo:
+        media, file_type = msg.photo[-1], "photo"
+    else:
+        await reply(update, "❌ ফাইল বা ছবি দাও")
+        return ADD_RESOURCE_FILE
+
+    parts = [p.strip() for p in (msg.caption or "").split("|")]
+    parts += [""] * (3 - len(parts))
+    course = normalize_course(parts[0])
+    category = parts[1].lower()
+    caption = parts[2] or "Resource File"
+
+    if not course or category not in RESOURCE_CATEGORIES:
+        await reply(update, "❌ ক্যাপশন ঠিক নেই। Ex: CSE 101 | lab | Lab sheet 1")
+        return ADD_RESOURCE_FILE
+
+    created = get_bd_time().strftime("%Y-%m-%d %H:%M:%S")
+
+    try:
+        with get_db() as conn:
+            exists = conn.execute(
+                "SELECT 1 FROM resources WHERE file_unique_id = ?",
+                (media.file_unique_id,)
+            ).fetchone()
+            conn.execute(
+                """INSERT INTO resources
+                   (file_id, file_unique_id, file_type, course, category, caption, created_at)
+                   VALUES (?, ?, ?, ?, ?, ?, ?)
+                   ON CONFLICT (file_unique_id) DO UPDATE SET
+                   course = excluded.course, category = excluded.category,
+                   caption = excluded.caption""",
+                (media.file_id, media.file_unique_id, file_type, course, category, caption, created)
+            )
+            conn.execute(
+                "INSERT OR REPLACE INTO resource_files (bot, file_unique_id, file_id) VALUES (?, ?, ?)",
+                (bot_name(context), media.file_unique_id, media.file_id)
+            )
+            row_id, file_type = conn.execute(
+                "SELECT id, file_type FROM resources WHERE file_unique_id = ?",
+                (media.file_unique_id,)
+            ).fetchone()
+            file_ids = dict(conn.execute(
+                "SELECT bot, file_id FROM resource_files WHERE file_unique_id = ?",
+                (media.file_unique_id,)
+            ))
+        index_resource(row_id, course, category, caption, file_ids, file_type)
+    except Exception as e:
+        logger.error("Error saving resource: %s", e)
+        await reply(update, "❌ রিসোর্স সেভ করতে সমস্যা হয়েছে")
+        return ADD_RESOURCE_FILE
+
+    if exists:
+        await reply(update, f"♻ ফাইলটি আগেই ছিল, ট্যাগ আপডেট হয়েছে: {course} | {category}")
+    else:
+        await reply(update, f"✅ সেভ হয়েছে: {course} | {category}")
+    return ADD_RESOURCE_FILE
+
+async def add_res_done(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    await reply(update, "✅ রিসোর্স যোগ করা শেষ")
+    return end_flow(context)
+
+async def view_resources(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    course, category, page = parse_resource_args(context.args or [])
+
+    if not course:
+        await send_nav_view(update, context, *courses_view(bot_name(context), "", 0))
+        return
+
+    query = """SELECT f.file_id, r.file_type, r.category, r.caption FROM resources r
+               JOIN resource_files f ON f.file_unique_id = r.file_unique_id AND f.bot = ?
+               WHERE r.course = ?"""
+    params = [bot_name(context), course]
+    if category:
+        query += " AND r.category = ?"
+        params.append(category)
+    query += " ORDER BY r.created_at DESC LIMIT ? OFFSET ?"
+    params += [RESOURCES_PAGE + 1, (page - 1) * RESOURCES_PAGE]
+
     with get_db() as conn:
-        notices = conn.execute("SELECT title, body FROM notices").fetchall()
+        files = conn.execute(query, params).fetchall()
 
-    if not notices:
-        await update.message.reply_text("📭 কোনো নোটিস নেই")
+    if not files:
+        await reply(update, f"📂 {course} এর জন্য কোনো রিসোর্স নেই")
         return
 
-    msg = ""
-    for t, b in notices:
-        msg += f"\n📌 {t}\n{b}\n"
+    for file_id, file_type, cat, caption in files[:RESOURCES_PAGE]:
+        await send_resource(update.effective_message, file_id, file_type, f"📘 {course} | {cat}\n{caption}")
+
+    if len(files) > RESOURCES_PAGE:
+        more = " ".join(filter(None, [course, category, f"p{page + 1}"]))
+        await reply(update, f"➡ আরও আছে: /res {more}")
+
+async def send_resource(message, file_id, file_type, text):
+    try:
+        if file_type == "photo":
+            await schedule_send(
+                message.chat_id,
+                lambda: message.reply_photo(photo=file_id, caption=text),
+            )
+        else:
+            await schedule_send(
+                message.chat_id,
+                lambda: message.reply_document(document=file_id, caption=text),
+            )
+    except Exception as e:
+        logger.error("Failed to send resource: %s", e)
+
+# ---------------------------------------------------------------------------
+# INLINE NAVIGATION
+# ---------------------------------------------------------------------------
 
-    await update.message.reply_text(msg)
+# Notices and the resource library are browsed with inline buttons. A tap is
+# answered at once and the same message is edited in place; callback_data is
+# "<view>:<arg>:<page>", where arg is a row id, never free text that could
+# outgrow the 64-byte limit (a course is keyed by its oldest resource). The
+# hash of what each message shows is kept, so a tap that would not change it
+# costs no API call.
+
+# (bot, chat_id, message_id) -> hash of the text and keyboard on screen; each
+# bot numbers its own messages, so the bot is part of the key
+nav_views = OrderedDict()
+
+def nav_data(view, arg, page):
+    data = f"{view}:{arg}:{page}"
+    return data if len(data.encode("utf-8")) <= CALLBACK_DATA_MAX else None
+
+def nav_label(text):
+    text = " ".join(str(text).split())
+    return text if len(text) <= NAV_LABEL_CHARS else text[:NAV_LABEL_CHARS - 1] + "…"
+
+def nav_keyboard(rows):
+    rows = [
+        [InlineKeyboardButton(label, callback_data=data) for label, data in row if data]
+        for row in rows
+    ]
+    return InlineKeyboardMarkup([row for row in rows if row])
+
+def pager(view, arg, page, has_next):
+    row = []
+    if page > 0:
+        row.append(("◀ আগে", nav_data(view, arg, page - 1)))
+    if has_next:
+        row.append(("পরে ▶", nav_data(view, arg, page + 1)))
+    return row
+
+def nav_hash(text, markup):
+    data = json.dumps([text, markup.to_dict() if markup else None], ensure_ascii=False)
+    return hashlib.sha1(data.encode("utf-8")).hexdigest()
+
+def nav_key(bot, message):
+    return (bot, message.chat_id, message.message_id)
+
+def remember_nav_view(bot, message, digest):
+    key = nav_key(bot, message)
+    nav_views[key] = digest
+    nav_views.move_to_end(key)
+    while len(nav_views) > NAV_VIEWS_MAX:
+        nav_views.popitem(last=False)
+
+def notices_view(bot, arg, page):
+    with get_db() as conn:
+        rows = conn.execute(
+            "SELECT id, title FROM notices ORDER BY id DESC LIMIT ? OFFSET ?",
+            (NAV_PAGE + 1, page * NAV_PAGE)
+        ).fetchall()
+
+    if not rows and page == 0:
+        return "📭 কোনো নোটিস নেই", None
+
+    has_next = len(rows) > NAV_PAGE
+    text = f"📢 নোটিস (পৃষ্ঠা {page + 1})\n"
+    buttons = []
+    for n, (notice_id, title) in enumerate(rows[:NAV_PAGE], start=page * NAV_PAGE + 1):
+        text += f"\n{n}. 📌 {title}"
+        buttons.append([(f"{n}. {nav_label(title)}", nav_data("nd", notice_id, page))])
+    return text, nav_keyboard(buttons + [pager("n", "", page, has_next)])
+
+def notice_view(bot, arg, page):
+    with get_db() as conn:
+        row = conn.execute("SELECT title, body, created_at FROM notices WHERE id = ?", (int(arg),)).fetchone()
+
+    back = [[("⬅ ফিরে যাও", nav_data("n", "", page))]]
+    if not row:
+        return "❌ নোটিসটি আর নেই", nav_keyboard(back)
+
+    title, body, created_at = row
+    text = f"📌 {title}\n\n{body}\n\n🕒 {created_at}"
+    return text[:MAX_MESSAGE_CHARS], nav_keyboard(back)
+
+def courses_view(bot, arg, page):
+    with get_db() as conn:
+        rows = conn.execute(
+            """SELECT r.course, COUNT(*), MIN(r.id) FROM resources r
+               JOIN resource_files f ON f.file_unique_id = r.file_unique_id AND f.bot = ?
+               WHERE r.course IS NOT NULL GROUP BY r.course ORDER BY r.course
+               LIMIT ? OFFSET ?""",
+            (bot, NAV_PAGE + 1, page * NAV_PAGE)
+        ).fetchall()
+
+    if not rows and page == 0:
+        return "📂 কোনো রিসোর্স নেই", None
+
+    has_next = len(rows) > NAV_PAGE
+    text = "📂 রিসোর্স লাইব্রেরি:\n\n"
+    buttons = []
+    for name, count, key in rows[:NAV_PAGE]:
+        text += f"📘 {name} — {count}টি ফাইল\n"
+        buttons.append([(f"📘 {nav_label(name)}", nav_data("rc", key, 0))])
+    text += "\nটাইপ দিয়ে খুঁজতে: /res <কোর্স> [টাইপ] [p<পৃষ্ঠা>] (Ex: /res CSE 101 lab p2)"
+    return text, nav_keyboard(buttons + [pager("r", "", page, has_next)])
+
+def course_view(bot, arg, page):
+    with get_db() as conn:
+        row = conn.execute("SELECT course FROM resources WHERE id = ?", (int(arg),)).fetchone()
+        course = row[0] if row else None
+        rows = conn.execute(
+            """SELECT r.id, r.category, r.caption FROM resources r
+               JOIN resource_files f ON f.file_unique_id = r.file_unique_id AND f.bot = ?
+               WHERE r.course = ? ORDER BY r.created_at DESC LIMIT ? OFFSET ?""",
+            (bot, course, NAV_PAGE + 1, page * NAV_PAGE)
+        ).fetchall()
+
+    back = ("⬅ সব কোর্স", nav_data("r", "", 0))
+    if not course:
+        return "❌ কোর্সটি আর নেই", nav_keyboard([[back]])
+    if not rows:
+        return f"📂 {course} এর জন্য কোনো রিসোর্স নেই", nav_keyboard([[back]])
+
+    has_next = len(rows) > NAV_PAGE
+    text = f"📘 {course} (পৃষ্ঠা {page + 1})\n"
+    buttons = []
+    for n, (resource_id, category, caption) in enumerate(rows[:NAV_PAGE], start=page * NAV_PAGE + 1):
+        text += f"\n{n}. [{category}] {caption}"
+        buttons.append([(f"📎 {n}. {nav_label(caption or category)}", nav_data("rf", resource_id, page))])
+    return text, nav_keyboard(buttons + [pager("rc", arg, page, has_next) + [back]])
+
+NAV_VIEWS = {
+    "n": notices_view,
+    "nd": notice_view,
+    "r": courses_view,
+    "rc": course_view,
+}
+
+async def send_nav_view(update, context, text, markup):
+    message = await reply(update, text, reply_markup=markup)
+    if markup:
+        remember_nav_view(bot_name(context), message, nav_hash(text, markup))
+
+async def nav_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    query = update.callback_query
+    await query.answer()
+
+    message = query.message
+    if not message:
+        return
+
+    bot = bot_name(context)
+    view, rest = query.data.split(":", 1)
+    arg, page = rest.rsplit(":", 1)
+
+    if view == "rf":
+        with get_db() as conn:
+            row = conn.execute(
+                """SELECT f.file_id, r.file_type, r.course, r.category, r.caption FROM resources r
+                   JOIN resource_files f ON f.file_unique_id = r.file_unique_id AND f.bot = ?
+                   WHERE r.id = ?""",
+                (bot, int(arg))
+            ).fetchone()
+        if row:
+            file_id, file_type, course, category, caption = row
+            await send_resource(message, file_id, file_type, f"📘 {course} | {category}\n{caption}")
+        return
+
+    text, markup = NAV_VIEWS[view](bot, arg, int(page))
+    digest = nav_hash(text, markup)
+    if nav_views.get(nav_key(bot, message)) == digest:
+        record_event("nav_unchanged", view)
+        return
+
+    try:
+        await schedule_send(message.chat_id, lambda: query.edit_message_text(text, reply_markup=markup))
+    except BadRequest as e:
+        # an edit that changes nothing is an error on Telegram's side too
+        if "not modified" not in str(e).lower():
+            return
+    remember_nav_view(bot, message, digest)
+
+# ---------------------------------------------------------------------------
+# PROFILER
+# ---------------------------------------------------------------------------
+
+THIS_FILE = os.path.basename(__file__)
+
+# empty while disabled: no sampler thread and no extra handler exist then
+profiler = {}
+
+def frame_label(code):
+    return f"{code.co_name} ({os.path.basename(code.co_filename)})"
+
+def thread_stack(frame):
+    names = []
+    while frame is not None:
+        names.append(frame_label(frame.f_code))
+        frame = frame.f_back
+    return names[::-1]
+
+def coro_stack(coro):
+    names = []
+    while coro is not None:
+        frame = getattr(coro, "cr_frame", None) or getattr(coro, "gi_frame", None)
+        if frame is None:
+            break
+        names.append(frame_label(frame.f_code))
+        coro = getattr(coro, "cr_await", None) or getattr(coro, "gi_yieldfrom", None)
+    return names
+
+def stack_owner(stack):
+    # first frame of this file below library code: the handler or job
+    seen_other = False
+    for name in stack.split(";"):
+        if name.endswith(f"({THIS_FILE})"):
+            if seen_other:
+                return name.split(" ")[0]
+        else:
+            seen_other = True
+    return "other"
+
+def sample_loop(loop, thread_id, stacks, stop):
+    while not stop.wait(PROFILE_INTERVAL):
+        frame = sys._current_frames().get(thread_id)
+        if frame is not None:
+            stacks[";".join(thread_stack(frame))] += 1
+
+        try:
+            tasks = asyncio.all_tasks(loop)
+        except RuntimeError:
+            continue
+
+        # suspended tasks show where handlers spend time waiting on I/O
+        for task in tasks:
+            coro = task.get_coro()
+            if getattr(coro, "cr_running", False):
+                continue
+            names = coro_stack(coro)
+            if names:
+                stacks[";".join(names + ["[await]"])] += 1
+
+def profile_summary(stacks):
+    owners = {}
+    for stack, count in stacks.items():
+        row = owners.setdefault(stack_owner(stack), [0, 0])
+        row[1 if stack.endswith("[await]") else 0] += count
+
+    lines = []
+    ranked = sorted(owners.items(), key=lambda kv: -sum(kv[1]))
+    for name, (cpu, wait) in ranked[:PROFILE_TOP]:
+        lines.append(f"{name}: cpu {cpu * PROFILE_INTERVAL:.2f}s, await {wait * PROFILE_INTERVAL:.2f}s")
+    return "\n".join(lines)
+
+async def finish_profile(application, from_job=False):
+    if not profiler:
+        return
+    state = dict(profiler)
+    profiler.clear()
+
+    state["stop"].set()
+    await asyncio.to_thread(state["thread"].join)
+    if state["handler"]:
+        application.remove_handler(state["handler"], group=PROFILE_GROUP)
+    if not from_job:
+        state["job"].schedule_removal()
+
+    stacks = state["stacks"]
+    dump = "".join(f"{stack} {count}\n" for stack, count in stacks.most_common())
+    elapsed = time.monotonic() - state["started"]
+    caption = (
+        f"🔬 Profile: {elapsed:.1f}s, {state['updates']} update(s), "
+        f"{sum(stacks.values())} samples\n\n" + profile_summary(stacks)
+    )
+
+    await schedule_send(state["chat_id"], lambda: application.bot.send_document(
+        state["chat_id"],
+        document=io.BytesIO(dump.encode()),
+        filename="profile.folded",
+        caption=caption[:1024],
+    ))
+
+async def profile_timeout_job(context: ContextTypes.DEFAULT_TYPE):
+    await finish_profile(context.application, from_job=True)
+
+async def count_profiled_update(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    if not profiler:
+        return
+    profiler["updates"] += 1
+    if profiler["max_updates"] and profiler["updates"] >= profiler["max_updates"]:
+        context.application.create_task(finish_profile(context.application))
+
+async def start_profile(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    if not is_admin(update.effective_user.username, context):
+        await reply(update, "⛔ শুধুমাত্র এডমিনদের জন্য")
+        return
+
+    if profiler:
+        await reply(update, "🔬 প্রোফাইলার আগে থেকেই চলছে")
+        return
+
+    try:
+        seconds = int(context.args[0]) if context.args else PROFILE_DEFAULT_SECONDS
+        max_updates = int(context.args[1]) if len(context.args) > 1 else 0
+    except ValueError:
+        await reply(update, "❗ /profile [সেকেন্ড] [আপডেট সংখ্যা]")
+        return
+    seconds = max(1, min(seconds, PROFILE_MAX_SECONDS))
+
+    stop = threading.Event()
+    stacks = Counter()
+    thread = threading.Thread(
+        target=sample_loop,
+        args=(asyncio.get_running_loop(), threading.get_ident(), stacks, stop),
+        daemon=True,
+    )
+
+    handler = None
+    if max_updates:
+        handler = TypeHandler(Update, count_profiled_update)
+        context.application.add_handler(handler, group=PROFILE_GROUP)
+
+    profiler.update(
+        chat_id=update.effective_chat.id,
+        started=time.monotonic(),
+        stacks=stacks,
+        stop=stop,
+        thread=thread,
+        handler=handler,
+        updates=0,
+        max_updates=max_updates,
+        job=context.job_queue.run_once(profile_timeout_job, seconds),
+    )
+    thread.start()
+
+    limit = f" অথবা {max_updates}টি আপডেট" if max_updates else ""
+    await reply(update, f"🔬 প্রোফাইলিং শুরু: {seconds}s{limit}")
+
+# ---------------------------------------------------------------------------
+# NOTICES & DIGEST
+# ---------------------------------------------------------------------------
+
+def build_digest(notices):
+    msg = "📰 নোটিস ডাইজেস্ট\n"
+    for index, (title, body) in enumerate(notices):
+        if len(body) > DIGEST_BODY_CHARS:
+            body = body[:DIGEST_BODY_CHARS] + "…"
+        entry = f"\n📌 {title}\n{body}\n"
+        if len(msg) + len(entry) > MAX_MESSAGE_CHARS:
+            msg += f"\n…আরও {len(notices) - index}টি নোটিস: 📢 Notices"
+            break
+        msg += entry
+    return msg
+
+async def digest_job(context: ContextTypes.DEFAULT_TYPE):
+    try:
+        with get_db() as conn:
+            pending = conn.execute(
+                "SELECT id, title, body FROM notices WHERE digested = 0 ORDER BY id"
+            ).fetchall()
+            if not pending:
+                return
+
+            last_id = pending[-1][0]
+            text = build_digest([(title, body) for _, title, body in pending])
+            conn.execute("UPDATE notices SET digested = 1 WHERE digested = 0 AND id <= ?", (last_id,))
+            queued = enqueue_outbox(conn, "subscribers", "text", text, PRIO_DIGEST, dedup_key=f"digest:{last_id}")
+    except Exception as e:
+        logger.error("Error in digest_job DB: %s", e)
+        return
+
+    outbox_wakeup.set()
+    logger.info("Digest of %d notice(s) queued for %d users", len(pending), queued)
+
+async def add_notice_start(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    if not is_admin(update.effective_user.username, context):
+        await reply(update, "⛔ শুধুমাত্র এডমিনদের জন্য")
+        return ConversationHandler.END
+
+    await reply(
+        update,
+        "📝 নোটিসের শিরোনাম লিখো\n"
+        f"(জরুরি হলে শুরুতে {URGENT_PREFIX} দাও, সাথে সাথে সবাইকে পাঠানো হবে)"
+    )
+    context.user_data[FLOW_KEY] = "notice"
+    return ADD_NOTICE_TITLE
+
+async def add_notice_title(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    context.user_data["notice_title"] = update.message.text.strip()
+    await reply(update, "📄 নোটিসের বিস্তারিত লিখো:")
+    return ADD_NOTICE_BODY
+
+async def add_notice_body(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    body = update.message.text.strip()
+    title = context.user_data.pop("notice_title", "Untitled")
+    urgent = title.startswith(URGENT_PREFIX)
+    title = title.lstrip(URGENT_PREFIX).strip() or "Untitled"
+    created_at = get_bd_time().strftime("%Y-%m-%d %H:%M:%S")
+
+    try:
+        with get_db() as conn:
+            cur = conn.execute(
+                "INSERT INTO notices (title, body, created_at, digested) VALUES (?, ?, ?, ?)",
+                (title, body, created_at, int(urgent))
+            )
+            if urgent:
+                text = f"🚨 জরুরি নোটিস\n\n📌 {title}\n{body}"
+                queued = enqueue_outbox(conn, "subscribers", "text", text, PRIO_BROADCAST)
+        index_notice(cur.lastrowid, title, body)
+    except Exception as e:
+        logger.error("Error inserting notice: %s", e)
+        await reply(update, "❌ নোটিস সেভ করতে সমস্যা হয়েছে")
+        return end_flow(context)
+
+    if urgent:
+        outbox_wakeup.set()
+        await reply(update, f"⏳ {queued} জনকে জরুরি নোটিস পাঠানো হচ্ছে...")
+    else:
+        await reply(update, f"✅ নোটিস সেভ হয়েছে, পরের ডাইজেস্টে ({', '.join(DIGEST_TIMES)}) যাবে")
+    return end_flow(context)
+
+async def toggle_digest(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    args = [a.lower() for a in context.args]
+    if args not in (["on"], ["off"]):
+        await reply(update, "❗ /digest on অথবা /digest off")
+        return
+
+    with get_db() as conn:
+        conn.execute(
+            "UPDATE users SET digest = ? WHERE bot = ? AND chat_id = ?",
+            (int(args[0] == "on"), bot_name(context), update.effective_user.id)
+        )
+    await reply(update, "✅ ডাইজেস্ট চালু" if args[0] == "on" else "🔕 ডাইজেস্ট বন্ধ")
+
+# ---------------------------------------------------------------------------
+# SEARCH INDEX & INLINE MODE
+# ---------------------------------------------------------------------------
+
+KIND_ORDER = {"class": 0, "notice": 1, "resource": 2}
+
+# key -> (tokens, item), token -> keys, and the tokens kept sorted for prefix scans
+search_docs = {}
+search_tokens = {}
+search_sorted = []
+
+def tokenize(text):
+    words = (w.strip(string.punctuation + "।") for w in text.lower().split())
+    return {w for w in words if w}
+
+def index_remove(key):
+    doc = search_docs.pop(key, None)
+    if not doc:
+        return
+    for token in doc[0]:
+        keys = search_tokens[token]
+        keys.discard(key)
+        if not keys:
+            del search_tokens[token]
+            del search_sorted[bisect.bisect_left(search_sorted, token)]
+
+def index_add(key, text, item):
+    index_remove(key)
+    tokens = tokenize(text)
+    search_docs[key] = (tokens, item)
+    for token in tokens:
+        keys = search_tokens.get(token)
+        if keys is None:
+            keys = search_tokens[token] = set()
+            bisect.insort(search_sorted, token)
+        keys.add(key)
+
+def index_notice(row_id, title, body):
+    # one over-long message would make Telegram reject the whole inline answer
+    text = f"📌 {title}\n{body}"[:MAX_MESSAGE_CHARS]
+    index_add(("notice", row_id), title, ("notice", row_id, title, text, None))
+
+def index_class(row_id, time_str, course, room, teacher, day=None):
+    # the index holds the whole week, so results name the day they run on
+    when = f"{day.title()} {time_str}" if day else time_str
+    text = f"⏰ {when} | {course} | {room} | {teacher}"
+    index_add(("class", row_id), f"{course} {room} {teacher} {day or ''}", ("class", row_id, f"{when} {course}", text, None))
+
+def index_resource(row_id, course, category, caption, file_ids, file_type):
+    # file_ids maps bot name -> that bot's file_id for this file
+    text = f"📘 {course} | {category}\n{caption}"
+    index_add(
+        ("resource", row_id),
+        f"{course} {category} {caption}",
+        ("resource", row_id, caption, text, (file_ids, file_type)),
+    )
+
+def reindex_classes():
+    for key in [k for k in search_docs if k[0] == "class"]:
+        index_remove(key)
+    with get_db() as conn:
+        for row in conn.execute("SELECT id, time_str, course, room, teacher, day FROM daily_classes"):
+            index_class(*row)
+
+def build_search_index():
+    with get_db() as conn:
+        for row in conn.execute("SELECT id, title, body FROM notices"):
+            index_notice(*row)
+        file_ids = {}
+        for bot, file_unique_id, file_id in conn.execute("SELECT bot, file_unique_id, file_id FROM resource_files"):
+            file_ids.setdefault(file_unique_id, {})[bot] = file_id
+        for row_id, course, category, caption, file_unique_id, file_type in conn.execute(
+            """SELECT id, course, category, caption, file_unique_id, file_type
+               FROM resources WHERE course IS NOT NULL"""
+        ):
+            index_resource(row_id, course, category, caption, file_ids.get(file_unique_id, {}), file_type)
+    reindex_classes()
+
+def prefix_keys(prefix):
+    keys = set()
+    i = bisect.bisect_left(search_sorted, prefix)
+    while i < len(search_sorted) and search_sorted[i].startswith(prefix):
+        keys |= search_tokens[search_sorted[i]]
+        i += 1
+    return keys
+
+def search(query, bot):
+    keys = None
+    for token in tokenize(query):
+        found = prefix_keys(token)
+        keys = found if keys is None else keys & found
+    if keys is None:
+        keys = search_docs.keys()
+    # files only show up in the bots that hold a file_id for them
+    keys = [k for k in keys if k[0] != "resource" or bot in search_docs[k][1][4][0]]
+    return sorted(keys, key=lambda k: (KIND_ORDER[k[0]], -k[1]))
+
+def inline_result(item, bot):
+    kind, row_id, title, text, media = item
+    result_id = f"{kind}:{row_id}"
+
+    if media:
+        file_id, file_type = media[0][bot], media[1]
+        if file_type == "photo":
+            return InlineQueryResultCachedPhoto(result_id, file_id, caption=text)
+        return InlineQueryResultCachedDocument(result_id, title, file_id, caption=text)
+
+    return InlineQueryResultArticle(
+        result_id, title, InputTextMessageContent(text), description=text[:100]
+    )
+
+async def inline_query(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    query = update.inline_query
+    offset = int(query.offset) if query.offset.isdigit() else 0
+
+    bot = bot_name(context)
+    keys = search(query.query, bot)
+    page = keys[offset:offset + INLINE_PAGE]
+    next_offset = str(offset + INLINE_PAGE) if len(keys) > offset + INLINE_PAGE else ""
+
+    await query.answer(
+        [inline_result(search_docs[key][1], bot) for key in page],
+        cache_time=INLINE_CACHE_TIME,
+        next_offset=next_offset,
+    )
+
+# ---------------------------------------------------------------------------
+# REMINDERS & BROADCAST
+# ---------------------------------------------------------------------------
+
+async def class_reminder_job(context: ContextTypes.DEFAULT_TYPE):
+    now = get_bd_time()
+    target_time = (now + datetime.timedelta(minutes=REMINDER_MINUTES)).strftime("%H:%M")
+    # a reminder that cannot go out before the class starts is dropped
+    expires_at = time.time() + REMINDER_MINUTES * 60
+
+    queued = 0
+    try:
+        with get_db() as conn:
+            classes = conn.execute(
+                """SELECT id, course, room, teacher FROM daily_classes
+                   WHERE time_str = ? AND (day IS NULL OR day = ?)""",
+                (target_time, WEEKDAYS[now.weekday()])
+            ).fetchall()
+            for class_id, course, room, teacher in classes:
+                text = (
+                    f"⏰ ক্লাস রিমাইন্ডার ({REMINDER_MINUTES} মিনিট বাকি)!\n\n"
+                    f"বিষয়: {course}\nসময়: {target_time}\nরুম: {room}\nশিক্ষক: {teacher}"
+                )
+                dedup_key = f"reminder:{now:%Y-%m-%d}:{target_time}:{class_id}"
+                queued += enqueue_outbox(conn, "all", "text", text, PRIO_REMINDER, expires_at, dedup_key)
+    except Exception as e:
+        logger.error("Error in class_reminder_job DB: %s", e)
+        return
+
+    if queued:
+        outbox_wakeup.set()
+        logger.info("Queued %d class reminder message(s)", queued)
+
+async def broadcast_start(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    if not is_admin(update.effective_user.username, context):
+        await reply(update, "⛔ শুধুমাত্র এডমিনদের জন্য")
+        return ConversationHandler.END
+
+    await reply(update, "📢 ব্রডকাস্ট মেসেজ/ফাইল পাঠাও:")
+    context.user_data[FLOW_KEY] = "broadcast"
+    return BROADCAST_MSG
+
+async def broadcast_finish(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    payload = json.dumps([update.effective_chat.id, update.message.message_id])
+    try:
+        with get_db() as conn:
+            queued = enqueue_outbox(conn, "all", "copy", payload, PRIO_BROADCAST, bot=bot_name(context))
+    except Exception as e:
+        logger.error("Error queueing broadcast: %s", e)
+        await reply(update, "❌ ব্রডকাস্ট করতে সমস্যা হয়েছে")
+        return end_flow(context)
+
+    outbox_wakeup.set()
+    await reply(update, f"⏳ {queued} জনকে পাঠানো হচ্ছে...")
+    return end_flow(context)
+
+# ---------------------------------------------------------------------------
+# TEACHER DIRECTORY
+# ---------------------------------------------------------------------------
+
+teacher_cache = {"text": None}
+
+def format_teacher(row):
+    teacher_id, name, subject, contact, email = row
+    line = f"#{teacher_id} {name} — {subject}"
+    if contact:
+        line += f"\n   📞 {contact}"
+    if email:
+        line += f"\n   📧 {email}"
+    return line
+
+def render_teacher_list():
+    if teacher_cache["text"] is None:
+        with get_db() as conn:
+            rows = conn.execute(
+                "SELECT id, name, subject, contact, email FROM teachers ORDER BY name"
+            ).fetchall()
+        lines = [format_teacher(row) for row in rows] or ["কোনো শিক্ষক যোগ করা হয়নি"]
+        teacher_cache["text"] = "👨‍🏫 University Teacher List\n\n" + "\n".join(lines)
+    return teacher_cache["text"]
+
+async def search_teachers(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    query = " ".join(context.args).strip()
+    if not query:
+        await reply(update, "❗ /teacher <নাম বা বিষয়> (Ex: /teacher cse)")
+        return
+
+    pattern = query.replace("%", "").replace("_", "") + "%"
+    with get_db() as conn:
+        rows = conn.execute(
+            """SELECT id, name, subject, contact, email FROM teachers
+               WHERE name LIKE ? OR subject LIKE ? ORDER BY name LIMIT ?""",
+            (pattern, pattern, TEACHER_SEARCH_LIMIT)
+        ).fetchall()
+
+    if not rows:
+        await reply(update, "🔍 কাউকে পাওয়া যায়নি")
+        return
+    await reply(update, "\n".join(format_teacher(row) for row in rows))
+
+async def add_teacher(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    if not is_admin(update.effective_user.username, context):
+        await reply(update, "⛔ শুধুমাত্র এডমিনদের জন্য")
+        return
+
+    parts = [p.strip() for p in " ".join(context.args).split("|")]
+    parts += [""] * (4 - len(parts))
+    name, subject, contact, email = parts[:4]
+    if not (name and subject):
+        await reply(update, "❗ /teacher_add নাম | বিষয় | ফোন | ইমেইল")
+        return
+
+    with get_db() as conn:
+        conn.execute(
+            "INSERT INTO teachers (name, subject, contact, email) VALUES (?, ?, ?, ?)",
+            (name, subject, contact or None, email or None)
+        )
+    teacher_cache["text"] = None
+    await reply(update, f"✅ যোগ হয়েছে: {name} — {subject}")
+
+async def delete_teacher(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    if not is_admin(update.effective_user.username, context):
+        await reply(update, "⛔ শুধুমাত্র এডমিনদের জন্য")
+        return
+
+    if len(context.args) != 1 or not context.args[0].lstrip("#").isdigit():
+        await reply(update, "❗ /teacher_del <id>")
+        return
+
+    with get_db() as conn:
+        deleted = conn.execute(
+            "DELETE FROM teachers WHERE id = ?", (int(context.args[0].lstrip("#")),)
+        ).rowcount
+    teacher_cache["text"] = None
+    await reply(update, "✅ মুছে ফেলা হয়েছে" if deleted else "❌ এই id নেই")
 
 # ---------------------------------------------------------------------------
 # TEXT HANDLER
@@ -1008,35 +3181,160 @@ async def show_notices(update: Update, context: ContextTypes.DEFAULT_TYPE):
 async def text_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
     text = update.message.text.strip()
 
-    if text == "🗓 Today Classes":
+    if text == "📅 Full Routine":
+        await show_full_routine(update, context)
+    elif text == "🗓 Today Classes":
         await show_today_classes(update, context)
     elif text == "👨‍🏫 Teachers":
         await show_teachers(update, context)
     elif text == "📢 Notices":
         await show_notices(update, context)
+    elif text == "📂 View Resources":
+        await view_resources(update, context)
     else:
-        await update.message.reply_text("❗ মেনু থেকে অপশন নাও")
+        await reply(update, "❗ মেনু থেকে অপশন নাও")
 
 # ---------------------------------------------------------------------------
 # MAIN
 # ---------------------------------------------------------------------------
 
-def main():
-    init_db()
-
-    app = ApplicationBuilder().token(BOT_TOKEN).build()
+def schedule_jobs(job_queue):
+    job_queue.run_repeating(class_reminder_job, interval=60, first=10)
+    job_queue.run_repeating(backup_job, interval=BACKUP_INTERVAL, first=60)
+    job_queue.run_repeating(send_failure_job, interval=SEND_FAILURE_FLUSH)
+    job_queue.run_repeating(prune_outbox_job, interval=60 * 60, first=60)
+    job_queue.run_repeating(stats_flush_job, interval=STATS_FLUSH)
+    job_queue.run_repeating(prune_stats_job, interval=60 * 60, first=120)
+    job_queue.run_repeating(evict_state_job, interval=USER_DATA_SWEEP)
+    for digest_time in DIGEST_TIMES:
+        hour, minute = map(int, digest_time.split(":"))
+        job_queue.run_daily(digest_job, time=datetime.time(hour, minute, tzinfo=BD_TZ))
+
+def add_handlers(app):
+    app.add_handler(TypeHandler(Update, track_update), group=-2)
+    app.add_handler(TypeHandler(Update, rate_limit), group=-1)
 
     app.add_handler(CommandHandler("start", start))
+    app.add_handler(CommandHandler("export", export_data))
+    app.add_handler(CommandHandler("res", view_resources))
+    app.add_handler(CommandHandler("throttle", show_throttle_stats))
+    app.add_handler(CommandHandler("profile", start_profile))
+    app.add_handler(CommandHandler("digest", toggle_digest))
+    app.add_handler(CommandHandler("queue", show_queue_stats))
+    app.add_handler(CommandHandler("stats", show_stats))
+    app.add_handler(CommandHandler("memory", show_memory))
+    app.add_handler(CommandHandler("teacher", search_teachers))
+    app.add_handler(CommandHandler("teacher_add", add_teacher))
+    app.add_handler(CommandHandler("teacher_del", delete_teacher))
+    app.add_handler(InlineQueryHandler(inline_query))
+    app.add_handler(CallbackQueryHandler(nav_callback, pattern=r"^(n|nd|r|rc|rf):"))
+
+    timeout_state = {ConversationHandler.TIMEOUT: [TypeHandler(Update, flow_timeout)]}
+
+    app.add_handler(ConversationHandler(
+        entry_points=[
+            CommandHandler("import", import_schedule_start),
+            MessageHandler(filters.Regex("^⚙ Import Classes$"), import_schedule_start),
+        ],
+        states={
+            IMPORT_SCHEDULE_FILE: [MessageHandler(filters.Document.ALL, import_schedule_finish)],
+            **timeout_state,
+        },
+        fallbacks=[CommandHandler("cancel", cancel)],
+        conversation_timeout=FLOW_TIMEOUT,
+    ))
+
+    app.add_handler(ConversationHandler(
+        entry_points=[MessageHandler(filters.Regex("^⚙ Add Notice$"), add_notice_start)],
+        states={
+            ADD_NOTICE_TITLE: [MessageHandler(filters.TEXT & ~filters.COMMAND, add_notice_title)],
+            ADD_NOTICE_BODY: [MessageHandler(filters.TEXT & ~filters.COMMAND, add_notice_body)],
+            **timeout_state,
+        },
+        fallbacks=[CommandHandler("cancel", cancel)],
+        conversation_timeout=FLOW_TIMEOUT,
+    ))
+
+    app.add_handler(ConversationHandler(
+        entry_points=[MessageHandler(filters.Regex("^⚙ Broadcast$"), broadcast_start)],
+        states={
+            BROADCAST_MSG: [MessageHandler(filters.ALL & ~filters.COMMAND, broadcast_finish)],
+            **timeout_state,
+        },
+        fallbacks=[CommandHandler("cancel", cancel)],
+        conversation_timeout=FLOW_TIMEOUT,
+    ))
+
+    app.add_handler(ConversationHandler(
+        entry_points=[MessageHandler(filters.Regex("^⚙ Add Resources$"), add_res_start)],
+        states={
+            ADD_RESOURCE_FILE: [MessageHandler((filters.Document.ALL | filters.PHOTO) & ~filters.COMMAND, add_res_finish)],
+            **timeout_state,
+        },
+        fallbacks=[CommandHandler("done", add_res_done), CommandHandler("cancel", cancel)],
+        conversation_timeout=FLOW_TIMEOUT,
+    ))
+
+    # after the conversations, so their own /cancel fallbacks run first
     app.add_handler(CommandHandler("cancel", cancel))
     app.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, text_handler))
 
-    print("✅ Bot is running successfully...")
-    app.run_polling()
+def build_application(conf, request):
+    app = ApplicationBuilder().token(conf["token"]).request(request).build()
+    app.bot_data["name"] = conf["name"]
+    app.bot_data["admins"] = bot_admin_set(conf)
+    add_handlers(app)
+    return app
+
+async def run_bots(apps):
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop.set)
+        except NotImplementedError:
+            pass
+
+    for app in apps:
+        await app.initialize()
+        applications[app.bot_data["name"]] = app
+    await start_outbound({name: app.bot for name, app in applications.items()})
+    install_reload_signal()
+
+    for app in apps:
+        await app.updater.start_polling()
+        await app.start()
+        logger.info("Bot %s (@%s) started", app.bot_data["name"], app.bot.username)
+
+    print(f"✅ Bot is running successfully... ({len(apps)} bot(s))")
+    try:
+        await stop.wait()
+    finally:
+        for app in apps:
+            if app.updater.running:
+                await app.updater.stop()
+            if app.running:
+                await app.stop()
+        await stop_outbound()
+        for app in apps:
+            await app.shutdown()
 
-if __name__ == "__main__":
-    main()
+def main():
+    load_config()
+    if not all(conf.get("token") for conf in BOTS):
+        raise ValueError("❌ BOT_TOKEN is missing! Set it in config.json or the environment")
 
+    init_db()
+    build_search_index()
 
+    # one HTTP pool for all bots' API calls; long polling keeps its own per bot
+    request = HTTPXRequest(connection_pool_size=HTTP_POOL_SIZE)
+    apps = [build_application(conf, request) for conf in BOTS]
 
+    # DB-wide jobs run once, on the first bot's queue
+    schedule_jobs(apps[0].job_queue)
 
+    asyncio.run(run_bots(apps))
 
+if __name__ == "__main__":
+    main()